@@ -1,11 +1,15 @@
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import tempfile
 import logging
+from fastapi.concurrency import run_in_threadpool
 from utils.pdf_processor import extract_text_from_pdf
+from utils.pdf_document import PDFDocument
+from utils.ingest import ingest_upload, UploadTooLargeError, InvalidPDFError
+from utils.page_selection import resolve_page_selection, format_page_range, PageSelectionError
 from utils.question_generator import generate_questions
 
 # Set up logging
@@ -29,12 +33,15 @@ async def root():
     return {"message": "PDF Test Generator API is running"}
 
 @app.post("/process_pdf")
-async def process_pdf(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def process_pdf(file: UploadFile = File(...), pages: Optional[str] = Form(None),
+                      outline: Optional[str] = Form(None)) -> Dict[str, Any]:
     """
     Process a PDF file and generate questions.
     
     Args:
         file: The uploaded PDF file
+        pages: Optional 1-based page range to process, e.g. "45-80"
+        outline: Optional bookmark title whose pages are processed, e.g. "Chapter 3"
         
     Returns:
         Dictionary with generated questions and metadata
@@ -42,18 +49,19 @@ async def process_pdf(file: UploadFile = File(...)) -> Dict[str, Any]:
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
+    temp_fd, temp_file_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(temp_fd)
+    
     try:
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(await file.read())
-            temp_file_path = temp_file.name
-        
-        # Extract text from PDF
-        logger.info(f"Extracting text from {file.filename}")
-        text, title = extract_text_from_pdf(temp_file_path)
+        # Stream the upload to a temporary file in chunks, hashing and page-counting it on the way
+        upload = await run_in_threadpool(ingest_upload, file.file, temp_file_path)
         
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        # Extract text from PDF, only from the selected pages if a range or bookmark was given
+        with PDFDocument(temp_file_path, sha256=upload.sha256) as document:
+            page_numbers = resolve_page_selection(document, pages, outline)
+            page_count = len(page_numbers) if page_numbers else upload.page_count
+            logger.info(f"Extracting text from {file.filename} ({page_count} of {upload.page_count} pages)")
+            text, title = extract_text_from_pdf(temp_file_path, document=document, pages=page_numbers)
         
         if not text:
             raise HTTPException(status_code=400, detail="Could not extract text from PDF")
@@ -64,12 +72,23 @@ async def process_pdf(file: UploadFile = File(...)) -> Dict[str, Any]:
         
         return {
             "title": title or file.filename,
+            "pages": format_page_range(page_numbers or range(upload.page_count)),
             "questions": questions
         }
     
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (InvalidPDFError, PageSelectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        # Clean up temp file
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
 
 if __name__ == "__main__":
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
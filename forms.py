@@ -1,8 +1,9 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, SelectField, IntegerField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange
+from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange, Optional, Regexp
 from models_mongo import User
+from utils.page_selection import PAGE_RANGE_PATTERN
 
 class LoginForm(FlaskForm):
     """Login form for user authentication"""
@@ -54,7 +55,21 @@ class UploadForm(FlaskForm):
         ('local', 'Local OCR (use local OCR tools)'),
         ('azure', 'Azure OCR (best for complex scanned documents)')
     ], default='auto')
+    page_range = StringField('Pages (optional)', validators=[
+        Optional(),
+        Length(max=100),
+        Regexp(PAGE_RANGE_PATTERN, message='Enter pages like 1-5, 8, 12-20')
+    ], render_kw={"placeholder": "e.g. 45-80 (leave empty for all pages)"})
+    outline_section = StringField('Chapter or Bookmark (optional)', validators=[
+        Optional(),
+        Length(max=200)
+    ], render_kw={"placeholder": "e.g. Chapter 3"})
     submit = SubmitField('Upload and Generate Questions')
+    
+    def validate_outline_section(self, outline_section):
+        """Validate only one kind of page selection is used"""
+        if outline_section.data and self.page_range.data:
+            raise ValidationError('Choose either a page range or a bookmark, not both.')
 
 class OJEEExamForm(FlaskForm):
     """Form for configuring OJEE mock exam settings"""
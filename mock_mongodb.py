@@ -182,6 +182,9 @@ class MockGridFS:
         self.files = {}
     
     def put(self, data, filename=None, **kwargs):
+        # Like GridFS, accept file-like objects as well as bytes
+        if hasattr(data, 'read'):
+            data = data.read()
         file_id = ObjectId()
         self.files[file_id] = {
             'data': data,
@@ -2,7 +2,6 @@ import os
 import json
 import logging
 import uuid
-import threading
 from datetime import datetime
 from flask import render_template, request, redirect, url_for, flash, session, jsonify, send_file
 from flask_login import login_required, current_user
@@ -13,8 +12,13 @@ from io import BytesIO
 from main import app
 from mongodb_config import mongo, stringify_object_id, fs
 from models_mongo import User, PDF, Test, UserTest
-from utils.pdf_processor import extract_text_from_pdf
-from utils.question_generator import generate_questions
+from utils.pdf_processor import extract_text_from_pdf, classify_document
+from utils.pdf_document import PDFDocument
+from utils.page_selection import resolve_page_selection, parse_page_range, format_page_range, PageSelectionError
+from utils.ingest import ingest_upload, UploadRejectedError
+from utils.question_generator import generate_questions_from_sections
+from utils.pipeline import Pipeline
+from utils.job_queue import JobQueue, QueueFullError
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -157,7 +161,31 @@ def upload():
             pdf_id = str(uuid.uuid4())
             unique_filename = f"{pdf_id}_{filename}"
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(filepath)
+            
+            # Stream the upload to disk, hashing and page-counting it on the way
+            try:
+                upload = ingest_upload(file.stream, filepath)
+            except UploadRejectedError as e:
+                logger.warning(f"Rejected upload {filename}: {str(e)}")
+                flash(f'Could not accept PDF: {str(e)}', 'danger')
+                return redirect(url_for('upload'))
+            
+            # Resolve the requested pages or bookmark, so a bad selection is reported right away, and
+            # classify native/OCR/hybrid now so the job carries it from the start
+            pages = None
+            preflight = None
+            try:
+                with PDFDocument(filepath, sha256=upload.sha256) as document:
+                    pages = resolve_page_selection(document, form.page_range.data, form.outline_section.data)
+                    if pages is None:
+                        # A page selection is classified by the job, on the selected pages only
+                        preflight = classify_document(document)
+            except PageSelectionError as e:
+                os.remove(filepath)
+                flash(f'Could not select pages: {str(e)}', 'danger')
+                return redirect(url_for('upload'))
+            except Exception as e:
+                logger.warning(f"Preflight classification failed for {filename}: {str(e)}")
             
             try:
                 # Start processing PDF in background
@@ -177,6 +205,9 @@ def upload():
                 session['processing_pdf_record_id'] = str(pdf_record['_id'])
                 session['processing_pdf_title'] = filename
                 session['processing_ocr_method'] = ocr_method  # Store OCR method in session
+                session['processing_pdf_sha256'] = upload.sha256
+                session['processing_pdf_preflight'] = preflight
+                session['processing_pdf_pages'] = format_page_range(pages) if pages else None
                 
                 # Redirect to processing page
                 return redirect(url_for('process_pdf'))
@@ -203,18 +234,44 @@ def process_pdf():
     pdf_record_id = session.get('processing_pdf_record_id')
     pdf_title = session.get('processing_pdf_title', 'Unknown Document')
     ocr_method = session.get('processing_ocr_method', 'auto')
+    sha256 = session.get('processing_pdf_sha256')
+    preflight = session.get('processing_pdf_preflight')
+    pages = session.get('processing_pdf_pages')
     
     if not pdf_id or not pdf_path or not pdf_record_id:
         flash('No PDF file found for processing', 'danger')
         return redirect(url_for('upload'))
     
-    # Get current user ID to pass to the background thread
+    # Get current user ID to pass to the background job
     user_id = current_user.get_id()
     
-    # Start processing in a background thread
-    threading.Thread(target=process_pdf_background, args=(
-        pdf_id, pdf_path, pdf_record_id, pdf_title, user_id, ocr_method
-    )).start()
+    # Queue processing once per PDF; reloading this page does not start a second job
+    try:
+        pdf_job_queue.submit(pdf_id, {
+            'pdf_path': pdf_path,
+            'pdf_record_id': pdf_record_id,
+            'pdf_title': pdf_title,
+            'user_id': user_id,
+            'ocr_method': ocr_method,
+            'sha256': sha256,
+            'preflight': preflight,
+            'pages': pages
+        })
+    except QueueFullError as e:
+        logger.warning(f"Refusing PDF job {pdf_id}: {str(e)}")
+        
+        # Nothing will process this upload; drop it so no record without a file is left behind
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        try:
+            mongo.db.pdfs.delete_one({"_id": ObjectId(pdf_record_id)})
+        except Exception as delete_error:
+            logger.error(f"Could not delete PDF record {pdf_record_id}: {str(delete_error)}")
+        for key in [key for key in session if key.startswith('processing_')]:
+            session.pop(key)
+        
+        flash('The server is busy processing other PDFs. Please upload your PDF again in a few minutes.', 'warning')
+        return redirect(url_for('upload'))
     
     return render_template('processing.html', pdf_id=pdf_id, pdf_title=pdf_title)
 
@@ -227,137 +284,248 @@ def pdf_status():
     if not pdf_id:
         return jsonify({'error': 'No PDF ID provided'}), 400
     
+    # Only the user who queued the PDF may see its status and take its test
+    job = pdf_job_queue.get(pdf_id)
+    if not job or job['payload'].get('user_id') != current_user.get_id():
+        return jsonify({'error': 'PDF not found'}), 404
+    
     # Get status from pdf_processor
     from utils.pdf_processor import processing_status
     
-    status = processing_status.get(pdf_id, {
+    status = processing_status.get(pdf_id) or {
         'step': 1,
         'progress': 0,
         'status': 'Initializing...',
         'complete': False
-    })
+    }
     
-    # Check if test is ready
-    test_id = session.get('test_id')
-    if test_id and status.get('progress', 0) >= 90:
-        status['complete'] = True
+    # Hand the finished test over to this user's session (background jobs have no session)
+    if status.get('complete') and status.get('test_id'):
+        session['test_id'] = status['test_id']
+        session['pdf_title'] = status.get('pdf_title', 'Untitled Document')
     
     return jsonify(status)
 
-def process_pdf_background(pdf_id: str, pdf_path: str, pdf_record_id: str, pdf_title: str, user_id: str, ocr_method: str = 'auto'):
-    """Process PDF in background thread"""
+@app.route('/cache_stats')
+@login_required
+def cache_stats():
+    """Return extraction cache hit/miss counters as JSON"""
+    from utils.extraction_cache import get_cache_stats
+    
+    return jsonify(get_cache_stats())
+
+def process_pdf_background(pdf_id: str, pdf_path: str, pdf_record_id: str, pdf_title: str, user_id: str, ocr_method: str = 'auto',
+                           sha256: str = None, preflight: dict = None, pages: str = None):
+    """
+    Process PDF in background thread.
+    
+    The job is a small graph of stages: extraction streams page sections into
+    question generation, GridFS storage runs alongside both, and the database
+    writes follow the stages they depend on. Stage timings are recorded on the
+    job status. `pages` is a 1-based page range; only those pages are processed.
+    
+    Errors are recorded on the job status and re-raised, so the job queue can
+    retry the job; the uploaded file is kept until the queue gives up on it.
+    Every stage is safe to re-run, and once the test has been created the job
+    is reported complete even if a later stage fails.
+    """
+    from utils.pdf_processor import processing_status
+    pipeline = None
+    file_id = None
     try:
         # Determine if Azure OCR should be used
         use_azure_ocr = ocr_method == 'azure'
         
-        # Extract text from PDF with selected OCR method
-        logger.info(f"Extracting text with OCR method: {ocr_method}")
-        text, title = extract_text_from_pdf(pdf_path, pdf_id, use_azure_ocr=use_azure_ocr)
-        
-        if not text:
-            logger.error(f"Could not extract text from PDF: {pdf_path}")
-            from utils.pdf_processor import processing_status
-            processing_status[pdf_id] = {
-                'step': 1,
-                'progress': 0,
-                'status': 'Error: Could not extract text from PDF',
-                'complete': True
-            }
-            return
-        
-        # Update PDF title if extracted from document
-        if title and title != pdf_title:
-            mongo.db.pdfs.update_one(
-                {"_id": ObjectId(pdf_record_id)},
-                {"$set": {"title": title}}
-            )
-            pdf_title = title
-        
-        # Update processing status
-        from utils.pdf_processor import processing_status
-        processing_status[pdf_id]['progress'] = 75
-        processing_status[pdf_id]['status'] = 'Generating questions'
-        
-        # Generate questions
-        logger.info("Generating questions")
-        questions = generate_questions(text)
-        
-        # Update processing status
-        processing_status[pdf_id]['progress'] = 85
-        processing_status[pdf_id]['status'] = 'Storing file'
-        
-        # Store file in MongoDB using GridFS
-        with open(pdf_path, 'rb') as pdf_file:
-            file_id = fs.put(pdf_file.read(), filename=pdf_title)
-        
-        # Update PDF record with file_id
-        mongo.db.pdfs.update_one(
-            {"_id": ObjectId(pdf_record_id)},
-            {"$set": {"file_id": file_id}}
-        )
-        
-        # Create test from questions
-        test = Test.create(
-            pdf_id=ObjectId(pdf_record_id),
-            questions=json.dumps(questions)
-        )
+        # Open and parse the upload once; extraction, OCR and GridFS storage all share it
+        with PDFDocument(pdf_path, sha256=sha256) as document:
+            # Reuse the classification made at upload time
+            document.preflight = preflight
+            page_numbers = parse_page_range(pages, document.page_count) if pages else None
+            if page_numbers:
+                logger.info(f"Processing pages {pages} of {document.page_count}")
+            
+            pipeline = Pipeline(pdf_id, processing_status)
+            sections = pipeline.channel()
+            reused_file_ids = []
+            
+            def extract(results):
+                # Extract text from PDF with selected OCR method, handing on sections as they are done
+                logger.info(f"Extracting text with OCR method: {ocr_method}")
+                text, title = extract_text_from_pdf(
+                    pdf_path, pdf_id, use_azure_ocr=use_azure_ocr, document=document,
+                    on_section=lambda section_text, start, end: sections.put((section_text, end - start)),
+                    pages=page_numbers
+                )
+                if not text:
+                    logger.error(f"Could not extract text from PDF: {pdf_path}")
+                    raise ValueError('Could not extract text from PDF')
+                processing_status.update(pdf_id, progress=75, status='Generating questions')
+                return title
+            
+            def generate(results):
+                # Generate questions from early pages while later ones are still being extracted
+                logger.info("Generating questions")
+                return generate_questions_from_sections(sections, len(page_numbers) if page_numbers else document.page_count)
+            
+            def store_file(results):
+                # A retried job reuses the copy an earlier attempt already stored and recorded
+                record = mongo.db.pdfs.find_one({"_id": ObjectId(pdf_record_id)})
+                if record and record.get('file_id'):
+                    reused_file_ids.append(record['file_id'])
+                    return record['file_id']
+                
+                # Store file in MongoDB using GridFS, streamed from the mapped file
+                with document.open_stream() as pdf_stream:
+                    return fs.put(pdf_stream, filename=pdf_title)
+            
+            def update_record(results):
+                # Update PDF record with file_id, and the title if extracted from document
+                fields = {"file_id": results['store_file']}
+                if results['extract'] and results['extract'] != pdf_title:
+                    fields["title"] = results['extract']
+                mongo.db.pdfs.update_one({"_id": ObjectId(pdf_record_id)}, {"$set": fields})
+            
+            def create_test(results):
+                # A retried job reuses the test an earlier attempt already created
+                existing = Test.get_by_pdf(pdf_record_id)
+                if existing:
+                    return existing[0]
+                
+                # Create test from questions
+                processing_status.update(pdf_id, progress=90, status='Saving test')
+                return Test.create(
+                    pdf_id=ObjectId(pdf_record_id),
+                    questions=json.dumps(results['generate'])
+                )
+            
+            def update_user_stats(results):
+                # Update user stats - Get user from ID instead of using current_user
+                if not user_id:
+                    return
+                # The PDF record notes that it was counted, so a retried job counts it once
+                record = mongo.db.pdfs.find_one({"_id": ObjectId(pdf_record_id)})
+                if record and record.get('stats_counted'):
+                    return
+                user_data = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+                if user_data:
+                    user = User(user_data)
+                    user.increment_pdfs_processed()
+                    mongo.db.pdfs.update_one({"_id": ObjectId(pdf_record_id)}, {"$set": {"stats_counted": True}})
+                    logger.info(f"Updated stats for user: {user.username}")
+                else:
+                    logger.error(f"User not found with ID: {user_id}")
+            
+            pipeline.stage('extract', extract, produces=[sections])
+            pipeline.stage('generate', generate)
+            pipeline.stage('store_file', store_file)
+            pipeline.stage('update_record', update_record, after=['extract', 'store_file'])
+            pipeline.stage('create_test', create_test, after=['extract', 'generate'])
+            pipeline.stage('update_user_stats', update_user_stats, after=['create_test'])
+            
+            try:
+                results = pipeline.run()
+            except Exception as e:
+                # Once the test exists the job has done its work; later failures are only logged
+                if 'create_test' not in pipeline.results:
+                    raise
+                logger.error(f"Error after test was created: {str(e)}")
+                results = pipeline.results
+            finally:
+                # A stored file that no PDF record points to yet is cleaned up
+                if 'update_record' not in pipeline.results and not reused_file_ids:
+                    file_id = pipeline.results.get('store_file')
         
-        # Update user stats - Get user from ID instead of using current_user
-        if user_id:
-            user_data = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-            if user_data:
-                user = User(user_data)
-                user.increment_pdfs_processed()
-                logger.info(f"Updated stats for user: {user.username}")
-            else:
-                logger.error(f"User not found with ID: {user_id}")
+        if file_id is not None:
+            _delete_stored_pdf(file_id)
+            file_id = None
         
-        # Store test ID in session (used by processing page to redirect)
-        from flask import session
-        session['test_id'] = str(test['_id'])
-        session['pdf_title'] = pdf_title
+        test = results['create_test']
+        pdf_title = results['extract'] or pdf_title
         
-        # Update processing status to complete
-        processing_status[pdf_id]['step'] = 4
-        processing_status[pdf_id]['progress'] = 100
-        processing_status[pdf_id]['status'] = 'Complete'
-        processing_status[pdf_id]['complete'] = True
+        # Update processing status to complete; /pdf_status moves the test ID into the session
+        processing_status.update(
+            pdf_id,
+            step=4,
+            progress=100,
+            status='Complete',
+            complete=True,
+            test_id=str(test['_id']),
+            pdf_title=pdf_title
+        )
         
         # Clean up local file after processing
         if os.path.exists(pdf_path):
             os.remove(pdf_path)
         
-        # Clean up OCR file if it exists
-        ocr_path = f"{pdf_path}_ocr.pdf"
-        if os.path.exists(ocr_path):
-            os.remove(ocr_path)
-            
-        # Clean up Azure OCR chunk files if they exist
-        chunks_dir = os.path.join(os.getcwd(), "chunks")
-        if os.path.exists(chunks_dir):
-            import shutil
-            try:
-                shutil.rmtree(chunks_dir)
-            except Exception as e:
-                logger.warning(f"Could not remove Azure OCR chunks directory: {str(e)}")
-            
         logger.info(f"PDF processing completed successfully: {pdf_title}")
         
     except Exception as e:
         logger.error(f"Error in background PDF processing: {str(e)}")
         
-        # Update processing status with error
-        from utils.pdf_processor import processing_status
-        processing_status[pdf_id] = {
+        # Drop the stored copy of a PDF no record points to
+        if file_id is not None:
+            _delete_stored_pdf(file_id)
+        
+        # Update processing status with error; the job is not complete until the queue gives up
+        processing_status.set(pdf_id, {
             'step': 1,
             'progress': 0,
-            'status': f'Error: {str(e)}',
-            'complete': True
-        }
+            'status': f'Error: {str(e)}. Retrying...',
+            'complete': False,
+            'stage_timings': pipeline.timings if pipeline else {}
+        })
         
-        # Clean up local file
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
+        # Let the job queue retry the job or report it as failed
+        raise
+
+def _delete_stored_pdf(file_id):
+    """Delete a stored PDF from GridFS, logging rather than raising on failure"""
+    try:
+        fs.delete(file_id)
+    except Exception as e:
+        logger.error(f"Could not delete stored PDF {file_id}: {str(e)}")
+
+def _run_pdf_job(pdf_id: str, payload: dict):
+    """Run a queued PDF processing job"""
+    process_pdf_background(pdf_id, **payload)
+
+def _pdf_job_failed(pdf_id: str, error: str):
+    """Report a PDF job the queue gave up on and clean up its upload"""
+    from utils.pdf_processor import processing_status
+    previous = processing_status.get(pdf_id) or {}
+    job = pdf_job_queue.get(pdf_id)
+    payload = job['payload'] if job else {}
+    
+    # A test created by an earlier attempt is still handed to the user
+    tests = Test.get_by_pdf(payload['pdf_record_id']) if payload.get('pdf_record_id') else []
+    if tests:
+        logger.error(f"PDF job {pdf_id} failed after its test was created: {error}")
+        processing_status.set(pdf_id, {
+            'step': 4,
+            'progress': 100,
+            'status': 'Complete',
+            'complete': True,
+            'test_id': str(tests[0]['_id']),
+            'pdf_title': payload.get('pdf_title', 'Untitled Document'),
+            'stage_timings': previous.get('stage_timings', {})
+        })
+    else:
+        processing_status.set(pdf_id, {
+            'step': 1,
+            'progress': 0,
+            'status': f'Error: {error}',
+            'complete': True,
+            'stage_timings': previous.get('stage_timings', {})
+        })
+    
+    # Clean up local file
+    pdf_path = payload.get('pdf_path')
+    if pdf_path and os.path.exists(pdf_path):
+        os.remove(pdf_path)
+
+# Persistent PDF processing queue; jobs left behind by a restart are resumed
+pdf_job_queue = JobQueue(_run_pdf_job, on_failure=_pdf_job_failed)
+pdf_job_queue.start()
 
 @app.route('/test')
 @login_required
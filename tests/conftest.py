@@ -0,0 +1,4 @@
+import os
+
+# Keep job status in memory so tests that track jobs write no status database
+os.environ.setdefault("JOB_STATUS_BACKEND", "memory")
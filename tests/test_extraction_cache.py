@@ -0,0 +1,39 @@
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from utils.extraction_cache import page_content_digest
+
+
+def _stream(writer, data: bytes, **entries):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    for key, value in entries.items():
+        stream[NameObject(f"/{key}")] = value
+    return writer._add_object(stream)
+
+
+def _page_with_form_image(image_data: bytes):
+    """A page that draws a form XObject, which in turn draws an image."""
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=100, height=100)
+    image = _stream(writer, image_data, Type=NameObject("/XObject"), Subtype=NameObject("/Image"),
+                    Width=NumberObject(len(image_data)), Height=NumberObject(1))
+    form = _stream(writer, b"q /Im0 Do Q", Type=NameObject("/XObject"), Subtype=NameObject("/Form"),
+                   Resources=DictionaryObject({NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): image})}))
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({NameObject("/Fm0"): form})
+    })
+    page[NameObject("/Contents")] = _stream(writer, b"q /Fm0 Do Q")
+    return page
+
+
+def test_digest_includes_images_inside_forms():
+    first = page_content_digest(_page_with_form_image(b"\x00\x10\x20"), 300)
+    second = page_content_digest(_page_with_form_image(b"\xff\xee\xdd"), 300)
+    assert first and second
+    assert first != second
+
+
+def test_digest_is_stable_for_identical_pages():
+    first = page_content_digest(_page_with_form_image(b"abc"), 300)
+    assert first == page_content_digest(_page_with_form_image(b"abc"), 300)
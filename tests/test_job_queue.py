@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+import utils.job_queue as job_queue
+from utils.job_queue import JobQueue, QueueFullError
+
+
+@pytest.fixture(autouse=True)
+def fast_queue(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_POLL_SECONDS", 0.01)
+
+
+def make_queue(tmp_path, handler=lambda job_id, payload: None, **kwargs):
+    return JobQueue(handler, db_path=str(tmp_path / "jobs.sqlite"), workers=1, **kwargs)
+
+
+def wait_for_state(queue, job_id, states, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job and job['state'] in states:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {states}: {queue.get(job_id)}")
+
+
+def test_submit_is_idempotent_by_job_id(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.submit('job', {'n': 1}) is True
+    assert queue.submit('job', {'n': 2}) is False
+    job = queue.get('job')
+    assert job['state'] == 'queued'
+    assert job['payload'] == {'n': 1}
+
+
+def test_submit_refuses_jobs_when_full(tmp_path):
+    queue = make_queue(tmp_path, max_pending=2)
+    queue.submit('a', {})
+    queue.submit('b', {})
+    with pytest.raises(QueueFullError):
+        queue.submit('c', {})
+    assert queue.get('c') is None
+    # A job that is already known is not refused
+    assert queue.submit('a', {}) is False
+
+
+def test_failing_job_is_retried_then_reported(tmp_path):
+    attempts = []
+    failures = []
+
+    def handler(job_id, payload):
+        attempts.append(job_id)
+        raise RuntimeError('boom')
+
+    queue = make_queue(tmp_path, handler, on_failure=lambda job_id, error: failures.append((job_id, error)))
+    queue.submit('job', {})
+    queue.start()
+    try:
+        job = wait_for_state(queue, 'job', {'failed'})
+    finally:
+        queue.stop()
+    assert len(attempts) == 3
+    assert job['attempts'] == 3
+    assert job['last_error'] == 'boom'
+    assert failures == [('job', 'boom')]
+
+
+def test_job_succeeds_on_retry(tmp_path):
+    attempts = []
+    failures = []
+
+    def handler(job_id, payload):
+        attempts.append(job_id)
+        if len(attempts) == 1:
+            raise RuntimeError('flaky')
+
+    queue = make_queue(tmp_path, handler, on_failure=lambda job_id, error: failures.append(job_id))
+    queue.submit('job', {})
+    queue.start()
+    try:
+        job = wait_for_state(queue, 'job', {'done'})
+    finally:
+        queue.stop()
+    assert job['attempts'] == 2
+    assert failures == []
+
+
+def test_expired_lease_is_reclaimed(tmp_path, monkeypatch):
+    queue = make_queue(tmp_path)
+    queue.submit('job', {'n': 1})
+
+    # A worker claims the job and dies without renewing its lease
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_LEASE_SECONDS", -1)
+    assert queue._claim() == ('job', {'n': 1}, 1)
+    assert queue.get('job')['state'] == 'running'
+
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_LEASE_SECONDS", 120)
+    assert queue._claim() == ('job', {'n': 1}, 2)
+    # The new lease is live, so nothing else is claimable
+    assert queue._claim() is None
+
+
+def test_expired_lease_past_max_attempts_is_reported(tmp_path, monkeypatch):
+    failures = []
+    queue = make_queue(tmp_path, on_failure=lambda job_id, error: failures.append(job_id))
+    queue.submit('job', {})
+
+    monkeypatch.setattr(job_queue, "JOB_QUEUE_LEASE_SECONDS", -1)
+    for attempt in range(1, 4):
+        assert queue._claim() == ('job', {}, attempt)
+
+    assert queue._claim() is None
+    assert queue.get('job')['state'] == 'failed'
+    assert failures == ['job']
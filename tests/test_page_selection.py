@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from utils.page_selection import PageSelectionError, _set_last_pages, format_page_range, parse_page_range
+
+
+def outline(*entries):
+    return [{'title': str(i), 'level': level, 'first_page': first_page} for i, (level, first_page) in enumerate(entries)]
+
+
+def scan_last_pages(entries, total_pages):
+    # Reference: look ahead from every entry for the next bookmark at the same or a higher level
+    for i, entry in enumerate(entries):
+        following = [
+            other['first_page'] for other in entries[i + 1:]
+            if other['level'] <= entry['level'] and other['first_page'] > entry['first_page']
+        ]
+        entry['last_page'] = following[0] - 1 if following else total_pages
+
+
+def test_parse_page_range_pages_and_ranges():
+    assert parse_page_range("1-3, 5", 10) == [0, 1, 2, 4]
+    assert parse_page_range(" 2 ", 10) == [1]
+
+
+def test_parse_page_range_open_ranges():
+    assert parse_page_range("8-", 10) == [7, 8, 9]
+    assert parse_page_range("-2", 10) == [0, 1]
+
+
+def test_parse_page_range_merges_overlaps():
+    assert parse_page_range("3-5,4-6,5", 10) == [2, 3, 4, 5]
+
+
+def test_parse_page_range_round_trips_with_format():
+    pages = parse_page_range("1-5,8,12-", 14)
+    assert format_page_range(pages) == "1-5,8,12-14"
+    assert parse_page_range(format_page_range(pages), 14) == pages
+
+
+@pytest.mark.parametrize("spec", ["0", "11", "5-11", "0-3", "12-"])
+def test_parse_page_range_rejects_pages_outside_document(spec):
+    with pytest.raises(PageSelectionError, match="outside the document"):
+        parse_page_range(spec, 10)
+
+
+def test_parse_page_range_rejects_reversed_range():
+    with pytest.raises(PageSelectionError, match="comes after"):
+        parse_page_range("5-3", 10)
+
+
+@pytest.mark.parametrize("spec", ["-", "a", "1-2-3", "3,x"])
+def test_parse_page_range_rejects_malformed_parts(spec):
+    with pytest.raises(PageSelectionError, match="Invalid page range"):
+        parse_page_range(spec, 10)
+
+
+@pytest.mark.parametrize("spec", ["", " , "])
+def test_parse_page_range_rejects_empty_range(spec):
+    with pytest.raises(PageSelectionError, match="empty"):
+        parse_page_range(spec, 10)
+
+
+def test_last_pages_of_nested_outline():
+    entries = outline((0, 1), (1, 2), (1, 5), (2, 6), (0, 9), (1, 9))
+    _set_last_pages(entries, 12)
+    assert [entry['last_page'] for entry in entries] == [8, 4, 8, 8, 12, 12]
+
+
+def test_last_pages_with_duplicate_start_pages():
+    # A bookmark runs past siblings that start on its own page
+    entries = outline((0, 1), (0, 1), (1, 1), (0, 4))
+    _set_last_pages(entries, 6)
+    assert [entry['last_page'] for entry in entries] == [3, 3, 3, 6]
+
+
+def test_last_pages_match_reference_scan_on_random_outlines():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        total_pages = rng.randint(1, 30)
+        entries = []
+        level = 0
+        first_page = 1
+        for _ in range(rng.randint(0, 15)):
+            level = rng.randint(0, level + 1) if entries else 0
+            first_page = min(total_pages, first_page + rng.choice([0, 0, 1, 2, 5]))
+            entries.append((level, first_page))
+
+        expected = outline(*entries)
+        scan_last_pages(expected, total_pages)
+        actual = outline(*entries)
+        _set_last_pages(actual, total_pages)
+        assert actual == expected
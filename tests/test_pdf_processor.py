@@ -0,0 +1,11 @@
+from utils.pdf_processor import _parse_ocrmypdf_sidecar
+
+
+def test_sidecar_skipped_range_covers_every_page():
+    pages = _parse_ocrmypdf_sidecar('[OCR skipped on page(s) 1-3]\fpage four text', 4)
+    assert pages == [None, None, None, 'page four text']
+
+
+def test_sidecar_mixed_sections_keep_page_order():
+    sidecar = 'one\f[OCR skipped on page(s) 2]\f[OCR skipped on page(s) 3, 4-5]\fsix'
+    assert _parse_ocrmypdf_sidecar(sidecar, 7) == ['one', None, None, None, None, 'six', '']
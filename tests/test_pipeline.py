@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from utils.job_status import InMemoryJobStatusStore
+from utils.pipeline import Pipeline, PipelineCancelled
+
+
+def test_stages_see_results_of_their_dependencies():
+    pipeline = Pipeline()
+    pipeline.stage('a', lambda results: 1)
+    pipeline.stage('b', lambda results: 2)
+    pipeline.stage('sum', lambda results: results['a'] + results['b'], after=['a', 'b'])
+    assert pipeline.run() == {'a': 1, 'b': 2, 'sum': 3}
+    assert set(pipeline.timings) == {'a', 'b', 'sum'}
+
+
+def test_unknown_dependency_is_rejected():
+    pipeline = Pipeline()
+    with pytest.raises(ValueError):
+        pipeline.stage('b', lambda results: None, after=['a'])
+
+
+def test_channel_streams_items_to_consumer():
+    pipeline = Pipeline()
+    items = pipeline.channel(maxsize=1)
+
+    def produce(results):
+        for i in range(10):
+            items.put(i)
+
+    pipeline.stage('produce', produce, produces=[items])
+    pipeline.stage('consume', lambda results: list(items))
+    assert pipeline.run()['consume'] == list(range(10))
+
+
+def test_stage_error_is_raised_and_dependents_are_skipped():
+    ran = []
+    pipeline = Pipeline()
+
+    def fail(results):
+        raise RuntimeError('boom')
+
+    pipeline.stage('fail', fail)
+    pipeline.stage('ok', lambda results: 'ok')
+    pipeline.stage('after_fail', lambda results: ran.append('after_fail'), after=['fail'])
+    with pytest.raises(RuntimeError, match='boom'):
+        pipeline.run()
+    assert ran == []
+    assert pipeline.results == {'ok': 'ok'}
+    assert 'after_fail' not in pipeline.timings
+
+
+def test_failing_consumer_cancels_blocked_producer():
+    produced = []
+    pipeline = Pipeline()
+    items = pipeline.channel(maxsize=1)
+
+    def produce(results):
+        # Would block forever on the full channel without cancellation
+        for i in range(1000):
+            items.put(i)
+            produced.append(i)
+
+    def consume(results):
+        for item in items:
+            raise RuntimeError('consumer failed')
+
+    pipeline.stage('produce', produce, produces=[items])
+    pipeline.stage('consume', consume)
+    with pytest.raises(RuntimeError, match='consumer failed'):
+        pipeline.run()
+    assert len(produced) < 1000
+    assert 'produce' not in pipeline.results
+
+
+def test_failing_producer_cancels_waiting_consumer():
+    started = threading.Event()
+    pipeline = Pipeline()
+    items = pipeline.channel()
+
+    def produce(results):
+        started.wait(5)
+        raise RuntimeError('producer failed')
+
+    def consume(results):
+        started.set()
+        return list(items)
+
+    pipeline.stage('produce', produce, produces=[items])
+    pipeline.stage('consume', consume)
+    # The producer's error is raised first, not the consumer's cancellation
+    with pytest.raises(RuntimeError, match='producer failed'):
+        pipeline.run()
+    assert 'consume' not in pipeline.results
+
+
+def test_cancelled_channel_rejects_put_and_iteration():
+    pipeline = Pipeline()
+    items = pipeline.channel()
+    items.cancel()
+    with pytest.raises(PipelineCancelled):
+        items.put(1)
+    with pytest.raises(PipelineCancelled):
+        list(items)
+
+
+def test_stage_timings_are_recorded_on_job_status():
+    store = InMemoryJobStatusStore()
+    pipeline = Pipeline('job', store)
+    pipeline.stage('a', lambda results: None)
+    pipeline.run()
+    assert set(store.get('job')['stage_timings']) == {'a'}
@@ -0,0 +1,33 @@
+import numpy as np
+
+from utils.sentence_similarity import SentenceMatrix
+
+
+def _dense(matrix: SentenceMatrix) -> np.ndarray:
+    dense = np.zeros((matrix.num_sentences, matrix.num_terms))
+    for row in range(matrix.num_sentences):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        dense[row, matrix.terms[start:end]] = matrix.weights[start:end]
+    return dense
+
+
+def test_rank_matches_dense_cosine_similarity():
+    sentences = ["the cat sat on the mat", "a dog sat on a log", "cats and dogs play", "the mat is red"]
+    matrix = SentenceMatrix(sentences)
+    similarity = _dense(matrix) @ _dense(matrix).T
+
+    [(candidates, scores)] = matrix.rank([0], [(0, 4)])
+    assert 0 not in candidates
+    assert np.allclose(scores, similarity[0, candidates], atol=1e-6)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_rank_query_without_terms_scores_zero():
+    matrix = SentenceMatrix(['日本語の文です。', 'the cat sat on the mat', 'dogs run fast'])
+    [(candidates, scores)] = matrix.rank([0], [(0, 3)])
+    assert sorted(candidates.tolist()) == [1, 2]
+    assert not scores.any()
+
+
+def test_rank_without_queries():
+    assert SentenceMatrix([]).rank([], []) == []
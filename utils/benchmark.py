@@ -0,0 +1,548 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import platform
+import argparse
+import logging
+import resource
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Optional, List, Dict, Any, Tuple
+import PyPDF2
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import pdf_processor
+from utils.pdf_processor import TEXT_BACKENDS, available_text_backends, _extract_page_range
+from utils.process_pools import shutdown_process_pools
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backends whose output overlaps the baseline less than this are not recommended
+BENCHMARK_MIN_SIMILARITY = 0.95
+
+# Synthetic corpus: every kind is generated at every size
+CORPUS_KINDS = ('native', 'image', 'mixed')
+CORPUS_SIZES = (10, 100, 500)
+CORPUS_SEED = 1234
+# Extraction paths timed by the suite; 'ocr' needs Tesseract and poppler installed
+SUITE_PATHS = ('extract', 'native', 'ocr', 'clean')
+# Slowdown or memory growth (as a share of the baseline) reported as a regression
+COMPARE_THRESHOLD = 0.10
+
+_WORDS = re.compile(r'\w+')
+
+# Letter-sized pages; image pages are rendered at 150 dpi
+_PAGE_WIDTH, _PAGE_HEIGHT = 612, 792
+_IMAGE_DPI = 150
+_VOCABULARY = (
+    "cell membrane protein energy enzyme molecule reaction structure function carbon oxygen "
+    "glucose respiration photosynthesis nucleus genome organism tissue evolution species "
+    "population ecosystem gradient transport signal receptor pathway synthesis metabolism"
+).split()
+
+def _collect_pdfs(paths: List[str]) -> List[str]:
+    """Expand files and directories (searched recursively) into a sorted list of PDF paths."""
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pdf_paths.extend(os.path.join(root, name) for name in files if name.lower().endswith('.pdf'))
+        elif os.path.isfile(path):
+            pdf_paths.append(path)
+        else:
+            logger.warning(f"Skipping {path}: not a file or directory")
+    return sorted(pdf_paths)
+
+def text_similarity(text: str, reference: str) -> float:
+    """
+    Compare two extraction results by the words they contain, ignoring layout.
+
+    Args:
+        text: Extracted text to check
+        reference: Extracted text to compare against
+
+    Returns:
+        Share of words the two texts have in common (1.0 means the same words)
+    """
+    words = Counter(_WORDS.findall(text.lower()))
+    reference_words = Counter(_WORDS.findall(reference.lower()))
+    total = max(sum(words.values()), sum(reference_words.values()))
+    if not total:
+        return 1.0
+    return sum((words & reference_words).values()) / total
+
+def benchmark_text_backends(pdf_paths: List[str], backends: Optional[List[str]] = None, repeat: int = 3,
+                            baseline: str = 'pypdf2', min_similarity: float = BENCHMARK_MIN_SIMILARITY) -> Dict[str, Any]:
+    """
+    Time each text extraction backend on a corpus of PDFs.
+    Each backend extracts every document `repeat` times and the fastest run is kept.
+    Output is compared with the baseline backend so a faster backend is only
+    recommended if it extracts equivalent text.
+
+    Args:
+        pdf_paths: PDF files to extract
+        backends: Backend names to compare (defaults to all available backends)
+        repeat: Runs per document and backend
+        baseline: Backend whose output the others are compared with
+        min_similarity: Lowest mean similarity to the baseline a recommended backend may have
+
+    Returns:
+        Dictionary with per-backend results and the recommended backend
+    """
+    backends = backends or available_text_backends()
+    if baseline not in backends:
+        backends = [baseline] + backends
+
+    documents = []
+    for pdf_path in pdf_paths:
+        try:
+            with open(pdf_path, 'rb') as file:
+                documents.append((pdf_path, len(PyPDF2.PdfReader(file).pages)))
+        except Exception as e:
+            logger.warning(f"Skipping {pdf_path}: {str(e)}")
+
+    outputs = {backend: {} for backend in backends}
+    results = {}
+    for backend in backends:
+        seconds = 0.0
+        errors = []
+        for pdf_path, total_pages in documents:
+            best = None
+            try:
+                for _ in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    page_texts = _extract_page_range(pdf_path, 0, total_pages, backend)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                outputs[backend][pdf_path] = "\n".join(page_texts)
+                seconds += best
+            except Exception as e:
+                errors.append(f"{pdf_path}: {str(e)}")
+
+        pages = sum(total_pages for pdf_path, total_pages in documents if pdf_path in outputs[backend])
+        results[backend] = {
+            'seconds': round(seconds, 4),
+            'pages': pages,
+            'pages_per_sec': round(pages / seconds, 2) if seconds else None,
+            'errors': errors
+        }
+
+    for backend in backends:
+        similarities = [
+            text_similarity(text, outputs[baseline][pdf_path])
+            for pdf_path, text in outputs[backend].items() if pdf_path in outputs[baseline]
+        ]
+        results[backend]['similarity'] = round(sum(similarities) / len(similarities), 4) if similarities else None
+
+    candidates = [
+        backend for backend in backends
+        if not results[backend]['errors'] and (results[backend]['similarity'] or 0) >= min_similarity
+    ]
+    recommended = min(candidates, key=lambda backend: results[backend]['seconds']) if candidates else None
+
+    return {
+        'documents': len(documents),
+        'pages': sum(total_pages for _, total_pages in documents),
+        'baseline': baseline,
+        'backends': results,
+        'recommended': recommended
+    }
+
+def _print_backend_report(report: Dict[str, Any]) -> None:
+    print(f"{report['documents']} documents, {report['pages']} pages (similarity against {report['baseline']})")
+    print(f"{'backend':<12}{'seconds':>10}{'pages/sec':>12}{'similarity':>12}  errors")
+    for backend, result in report['backends'].items():
+        pages_per_sec = result['pages_per_sec'] if result['pages_per_sec'] is not None else '-'
+        similarity = result['similarity'] if result['similarity'] is not None else '-'
+        print(f"{backend:<12}{result['seconds']:>10}{pages_per_sec:>12}{similarity:>12}  {len(result['errors'])}")
+    print(f"Recommended PDF_TEXT_BACKEND: {report['recommended'] or 'none'}")
+
+def _page_lines(rng: random.Random, page_num: int, lines: int = 36) -> List[str]:
+    """Deterministic body text for one page, with a running header and a page number footer."""
+    body = [" ".join(rng.choice(_VOCABULARY) for _ in range(9)).capitalize() + "." for _ in range(lines)]
+    return ["Synthetic Benchmark Corpus"] + body + [str(page_num + 1)]
+
+def _text_page_content(lines: List[str]) -> bytes:
+    """PDF content stream drawing lines of Helvetica text."""
+    commands = ["BT", "/F1 11 Tf", "14 TL", f"56 {_PAGE_HEIGHT - 56} Td"]
+    for line in lines:
+        commands.append("(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '")
+    commands.append("ET")
+    return "\n".join(commands).encode('latin-1')
+
+def _image_page(lines: List[str], font, words: Dict[str, Image.Image]) -> Tuple[bytes, int, int]:
+    """
+    Render lines of text into a grayscale scan, returning the Flate-compressed pixels and size.
+    Each word is drawn once into `words` and pasted from there, which is much faster than
+    laying out every line with the font again.
+    """
+    width, height = _PAGE_WIDTH * _IMAGE_DPI // 72, _PAGE_HEIGHT * _IMAGE_DPI // 72
+    margin = 56 * _IMAGE_DPI // 72
+    line_height = 14 * _IMAGE_DPI // 72
+    space = int(font.getlength(" "))
+
+    image = Image.new('L', (width, height), 255)
+    for i, line in enumerate(lines):
+        x = margin
+        for word in line.split(" "):
+            if word not in words:
+                mask = Image.new('L', (max(1, int(font.getlength(word))), line_height), 0)
+                ImageDraw.Draw(mask).text((0, 0), word, fill=255, font=font)
+                words[word] = mask
+            image.paste(0, (x, margin + i * line_height), words[word])
+            x += words[word].width + space
+    data = zlib.compress(image.tobytes(), 6)
+    image.close()
+    return data, width, height
+
+def write_synthetic_pdf(path: str, pages: int, kind: str, seed: int = CORPUS_SEED) -> None:
+    """
+    Write a deterministic test PDF: the same arguments always produce the same bytes.
+
+    Args:
+        path: Where to write the PDF
+        pages: Number of pages
+        kind: 'native' (text layer only), 'image' (scanned pages only) or 'mixed' (every third page scanned)
+        seed: Seed for the page text
+    """
+    if kind not in CORPUS_KINDS:
+        raise ValueError(f"Unknown corpus kind '{kind}', expected one of {', '.join(CORPUS_KINDS)}")
+
+    rng = random.Random(f"{seed}:{kind}:{pages}")
+    words = {}
+    try:
+        font = ImageFont.load_default(size=11 * _IMAGE_DPI // 72)
+    except TypeError:
+        # Pillow < 10.1 only has the small bitmap font
+        font = ImageFont.load_default()
+
+    # Objects 1-3 are the catalog, page tree and font; each page adds its page, content and image objects
+    objects = {3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    page_refs = []
+    next_id = 4
+    for page_num in range(pages):
+        lines = _page_lines(rng, page_num)
+        scanned = kind == 'image' or (kind == 'mixed' and page_num % 3 == 2)
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+
+        if scanned:
+            image_id = next_id
+            next_id += 1
+            data, width, height = _image_page(lines, font, words)
+            objects[image_id] = (
+                f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} /ColorSpace /DeviceGray "
+                f"/BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+            )
+            content = f"q {_PAGE_WIDTH} 0 0 {_PAGE_HEIGHT} 0 0 cm /Im0 Do Q".encode()
+            resources = f"<< /XObject << /Im0 {image_id} 0 R >> >>"
+        else:
+            content = _text_page_content(lines)
+            resources = "<< /Font << /F1 3 0 R >> >>"
+
+        objects[content_id] = f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream"
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_PAGE_WIDTH} {_PAGE_HEIGHT}] "
+            f"/Resources {resources} /Contents {content_id} 0 R >>"
+        ).encode()
+        page_refs.append(f"{page_id} 0 R")
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {pages} >>".encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial_path = f"{path}.part"
+    with open(partial_path, 'wb') as out:
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = {}
+        for object_id in sorted(objects):
+            offsets[object_id] = out.tell()
+            out.write(f"{object_id} 0 obj\n".encode() + objects[object_id] + b"\nendobj\n")
+        xref_offset = out.tell()
+        out.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+        for object_id in range(1, next_id):
+            out.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+        out.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    os.replace(partial_path, path)
+
+def build_corpus(directory: str, kinds: Optional[List[str]] = None, sizes: Optional[List[int]] = None,
+                 seed: int = CORPUS_SEED) -> List[Dict[str, Any]]:
+    """
+    Generate the synthetic benchmark corpus, reusing files that already exist
+    (the generator is deterministic, so an existing file is identical).
+
+    Args:
+        directory: Where to store the PDFs
+        kinds: Corpus kinds (defaults to CORPUS_KINDS)
+        sizes: Page counts (defaults to CORPUS_SIZES)
+        seed: Seed for the page text
+
+    Returns:
+        List of dictionaries with path, kind and pages of each document
+    """
+    corpus = []
+    for kind in kinds or CORPUS_KINDS:
+        for pages in sizes or CORPUS_SIZES:
+            path = os.path.join(directory, f"{kind}-{pages}-s{seed}.pdf")
+            if not os.path.exists(path):
+                logger.info(f"Generating {path}")
+                write_synthetic_pdf(path, pages, kind, seed)
+            corpus.append({'path': path, 'kind': kind, 'pages': pages})
+    return corpus
+
+def _ocr_available() -> bool:
+    return bool(shutil.which('tesseract') and shutil.which('pdftoppm'))
+
+def _run_path(path_name: str, pdf_path: str) -> int:
+    """Run one extraction path on a PDF and return the number of characters it produced."""
+    if path_name == 'extract':
+        text, _ = pdf_processor.extract_text_from_pdf(pdf_path)
+        return len(text)
+    with pdf_processor.PDFDocument(pdf_path) as document:
+        if path_name == 'native':
+            return sum(len(page_text) for page_text in pdf_processor.extract_page_texts(document))
+        if path_name == 'ocr':
+            return len(pdf_processor.extract_text_with_ocr(document))
+    raise ValueError(f"Unknown benchmark path '{path_name}'")
+
+def _measure_path(path_name: str, pdf_path: str, pages: int, repeat: int) -> Dict[str, Any]:
+    """
+    Time one extraction path on one PDF. Runs in a fresh process so peak RSS
+    belongs to this measurement alone; CPU time includes worker processes.
+    """
+    # Never serve results from a cache left behind by another run
+    from utils import extraction_cache
+    extraction_cache.EXTRACTION_CACHE_ENABLED = False
+    logging.disable(logging.CRITICAL)
+
+    if path_name == 'clean':
+        # Time clean_text alone, on the raw native text of the document
+        with pdf_processor.PDFDocument(pdf_path) as document:
+            text = "\n".join(pdf_processor.extract_page_texts(document))
+        shutdown_process_pools()
+        run = lambda: len(pdf_processor.clean_text(text))
+    else:
+        run = lambda: _run_path(path_name, pdf_path)
+
+    best = None
+    chars = 0
+    for _ in range(max(1, repeat)):
+        usage_before = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        chars = run()
+        # Wait for the shared worker pools to exit so their CPU time and memory are accounted
+        shutdown_process_pools()
+        seconds = time.perf_counter() - started
+        usage_after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_seconds = sum(
+            (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+            for before, after in zip(usage_before, usage_after)
+        )
+        if best is None or seconds < best['seconds']:
+            best = {'seconds': seconds, 'cpu_seconds': cpu_seconds}
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'seconds': round(best['seconds'], 4),
+        'cpu_seconds': round(best['cpu_seconds'], 4),
+        'pages_per_sec': round(pages / best['seconds'], 2) if best['seconds'] else None,
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+        'chars': chars
+    }
+
+def run_suite(corpus: List[Dict[str, Any]], paths: Optional[List[str]] = None, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Time every extraction path on every corpus document, each measurement in a
+    fresh process. Paths that would OCR scanned pages are skipped on hosts
+    without Tesseract and poppler; OCR is not run on native documents and
+    cleanup not on image-only ones, which have no text to clean.
+
+    Args:
+        corpus: Documents as returned by build_corpus
+        paths: Extraction paths to time (defaults to SUITE_PATHS)
+        repeat: Runs per measurement, the fastest is kept
+
+    Returns:
+        Report dictionary with host details and one result per path and document
+    """
+    paths = paths or list(SUITE_PATHS)
+    ocr_available = _ocr_available()
+    results = []
+    for entry in corpus:
+        for path_name in paths:
+            result = {'path': path_name, 'kind': entry['kind'], 'pages': entry['pages']}
+            if (path_name, entry['kind']) in (('ocr', 'native'), ('clean', 'image')):
+                continue
+            if path_name in ('ocr', 'extract') and entry['kind'] != 'native' and not ocr_available:
+                result['skipped'] = 'tesseract or pdftoppm not installed'
+            else:
+                logger.info(f"Measuring {path_name} on {entry['path']}")
+                try:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                        result.update(executor.submit(
+                            _measure_path, path_name, entry['path'], entry['pages'], repeat
+                        ).result())
+                except Exception as e:
+                    result['error'] = str(e)
+            results.append(result)
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'text_backend': pdf_processor.get_text_backend(),
+            'ocr_available': ocr_available
+        },
+        'results': results
+    }
+
+def _result_key(result: Dict[str, Any]) -> str:
+    return f"{result['path']}/{result['kind']}-{result['pages']}"
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = COMPARE_THRESHOLD) -> Dict[str, Any]:
+    """
+    Compare two suite reports measurement by measurement.
+
+    Args:
+        baseline: Earlier report from run_suite
+        current: New report from run_suite
+        threshold: Relative drop in pages/sec or growth in peak RSS reported as a regression
+
+    Returns:
+        Dictionary with the relative change of each measurement present in both
+        reports and the list of regressions
+    """
+    baseline_results = {_result_key(result): result for result in baseline['results'] if 'seconds' in result}
+    changes = []
+    regressions = []
+    for result in current['results']:
+        key = _result_key(result)
+        before = baseline_results.get(key)
+        if 'seconds' not in result or before is None:
+            continue
+
+        change = {'measurement': key}
+        for metric in ('pages_per_sec', 'cpu_seconds', 'peak_rss_mb'):
+            if before.get(metric) and result.get(metric) is not None:
+                change[metric] = round(result[metric] / before[metric] - 1, 4)
+        changes.append(change)
+
+        if change.get('pages_per_sec', 0) < -threshold or change.get('peak_rss_mb', 0) > threshold:
+            regressions.append(key)
+
+    return {'threshold': threshold, 'changes': changes, 'regressions': regressions}
+
+def _print_suite_report(report: Dict[str, Any]) -> None:
+    host = report['host']
+    print(f"Python {host['python']} on {host['platform']}, {host['cpus']} CPUs, text backend {host['text_backend']}")
+    print(f"{'path':<10}{'document':<14}{'seconds':>10}{'cpu':>10}{'pages/sec':>12}{'peak MB':>10}{'chars':>10}")
+    for result in report['results']:
+        document = f"{result['kind']}-{result['pages']}"
+        if 'seconds' in result:
+            print(f"{result['path']:<10}{document:<14}{result['seconds']:>10}{result['cpu_seconds']:>10}"
+                  f"{result['pages_per_sec'] or '-':>12}{result['peak_rss_mb']:>10}{result['chars']:>10}")
+        else:
+            print(f"{result['path']:<10}{document:<14}  {result.get('skipped') or 'error: ' + result.get('error', '')}")
+
+def _print_comparison(comparison: Dict[str, Any]) -> None:
+    print(f"{'measurement':<26}{'pages/sec':>12}{'cpu':>10}{'peak MB':>10}")
+    for change in comparison['changes']:
+        columns = [
+            f"{change[metric]:+.1%}" if metric in change else '-'
+            for metric in ('pages_per_sec', 'cpu_seconds', 'peak_rss_mb')
+        ]
+        print(f"{change['measurement']:<26}{columns[0]:>12}{columns[1]:>10}{columns[2]:>10}")
+    if comparison['regressions']:
+        print(f"Regressions (>{comparison['threshold']:.0%}): {', '.join(comparison['regressions'])}")
+    else:
+        print("No regressions")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m utils.benchmark', description='Benchmark PDF processing')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backends_parser = commands.add_parser('backends', help='compare text extraction backends on local PDFs')
+    backends_parser.add_argument('paths', nargs='+', help='PDF files or directories containing PDFs')
+    backends_parser.add_argument('--backends', nargs='+', choices=list(TEXT_BACKENDS), help='backends to compare')
+    backends_parser.add_argument('--repeat', type=int, default=3, help='runs per document, the fastest is kept')
+    backends_parser.add_argument('--baseline', default='pypdf2', choices=list(TEXT_BACKENDS))
+    backends_parser.add_argument('--min-similarity', type=float, default=BENCHMARK_MIN_SIMILARITY)
+    backends_parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+
+    corpus_parser = commands.add_parser('corpus', help='generate the synthetic benchmark PDFs')
+    corpus_parser.add_argument('directory', help='where to write the PDFs')
+    corpus_parser.add_argument('--kinds', nargs='+', choices=CORPUS_KINDS, help='document kinds to generate')
+    corpus_parser.add_argument('--sizes', nargs='+', type=int, help='page counts to generate')
+    corpus_parser.add_argument('--seed', type=int, default=CORPUS_SEED)
+
+    suite_parser = commands.add_parser('suite', help='time extraction, OCR and cleanup on the synthetic corpus')
+    suite_parser.add_argument('--corpus-dir', default=os.path.join('cache', 'benchmark'),
+                              help='where the synthetic PDFs are kept (generated if missing)')
+    suite_parser.add_argument('--kinds', nargs='+', choices=CORPUS_KINDS, help='document kinds to measure')
+    suite_parser.add_argument('--sizes', nargs='+', type=int, help='page counts to measure')
+    suite_parser.add_argument('--paths', nargs='+', choices=SUITE_PATHS, help='extraction paths to time')
+    suite_parser.add_argument('--repeat', type=int, default=1, help='runs per measurement, the fastest is kept')
+    suite_parser.add_argument('--seed', type=int, default=CORPUS_SEED)
+    suite_parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+
+    compare_parser = commands.add_parser('compare', help='compare two suite results; exits with 1 on regressions')
+    compare_parser.add_argument('baseline', help='JSON results of the earlier run')
+    compare_parser.add_argument('current', help='JSON results of the new run')
+    compare_parser.add_argument('--threshold', type=float, default=COMPARE_THRESHOLD,
+                                help='relative slowdown or memory growth reported as a regression')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == 'backends':
+        pdf_paths = _collect_pdfs(args.paths)
+        if not pdf_paths:
+            parser.error('no PDF files found')
+
+        unavailable = (set(args.backends or []) | {args.baseline}) - set(available_text_backends())
+        if unavailable:
+            parser.error(f"backends not available on this host: {', '.join(sorted(unavailable))}")
+
+        report = benchmark_text_backends(pdf_paths, args.backends, args.repeat, args.baseline, args.min_similarity)
+        _print_backend_report(report)
+        if args.json_path:
+            with open(args.json_path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    elif args.command == 'corpus':
+        for entry in build_corpus(args.directory, args.kinds, args.sizes, args.seed):
+            print(f"{entry['path']} ({entry['kind']}, {entry['pages']} pages)")
+
+    elif args.command == 'suite':
+        corpus = build_corpus(args.corpus_dir, args.kinds, args.sizes, args.seed)
+        report = run_suite(corpus, args.paths, args.repeat)
+        _print_suite_report(report)
+        if args.json_path:
+            with open(args.json_path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    elif args.command == 'compare':
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        comparison = compare_reports(baseline, current, args.threshold)
+        _print_comparison(comparison)
+        return 1 if comparison['regressions'] else 0
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Tuple, Optional, List, Dict, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Extraction cache configuration from environment variables
+EXTRACTION_CACHE_ENABLED = os.environ.get("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR", "cache")
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # 512MB
+PAGE_OCR_CACHE_MAX_BYTES = int(os.environ.get("PAGE_OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256MB
+
+# Bump when the extraction pipeline changes its output, so stale entries are never served
+EXTRACTION_CACHE_VERSION = 3
+
+def _hash_xobjects(digest, resources, seen: set) -> None:
+    """Add the XObjects of a resource dictionary to a digest, recursing into form XObjects."""
+    resources = resources.get_object() if resources else None
+    xobjects = resources.get('/XObject') if resources else None
+    if not xobjects:
+        return
+    xobjects = xobjects.get_object()
+    for name in sorted(xobjects):
+        reference = xobjects[name]
+        xobject = reference.get_object()
+        digest.update(name.encode())
+        # Hash the stored (still encoded) stream, decoding large images would defeat the point
+        digest.update(getattr(xobject, '_data', None) or xobject.get_data())
+        
+        # A form's own stream only draws its resources, e.g. "/Im0 Do"; the images are below it
+        key = getattr(reference, 'idnum', None) or id(xobject)
+        if xobject.get('/Subtype') == '/Form' and key not in seen:
+            seen.add(key)
+            _hash_xobjects(digest, xobject.get('/Resources'), seen)
+
+def page_content_digest(page, dpi: int) -> Optional[str]:
+    """
+    Fingerprint a PDF page by its content stream and the raw data of the
+    images it draws, including images inside form XObjects, so identical
+    pages in different files share a key without being rendered first.
+
+    Args:
+        page: PyPDF2 page object
+        dpi: Rasterization resolution the OCR text is produced at
+
+    Returns:
+        Hex digest string, or None if the page could not be fingerprinted
+    """
+    try:
+        digest = hashlib.sha256(f"v{EXTRACTION_CACHE_VERSION}:{dpi}:{page.get('/Rotate', 0)}".encode())
+
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+
+        _hash_xobjects(digest, page.get('/Resources'), set())
+
+        return digest.hexdigest()
+    except Exception as e:
+        logger.warning(f"Could not fingerprint PDF page: {str(e)}")
+        return None
+
+class _LRUCacheStore:
+    """
+    Base for the SQLite-backed caches: one table per cache, entries evicted
+    least-recently-used first once their total size exceeds max_bytes, and
+    hit/miss counters for monitoring.
+    """
+
+    table = None
+    columns = ()
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.db_path = os.path.join(cache_dir, "extraction_cache.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        column_defs = ", ".join(self.columns)
+        with self._connect() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    {column_defs},
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _record(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least-recently-used entries until the cache fits in max_bytes."""
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted)
+        logger.info(f"Evicted {len(evicted)} entries from the {self.table} cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this process and the current cache size."""
+        lookups = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'max_bytes': self.max_bytes
+        }
+        try:
+            with self._connect() as conn:
+                entries, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            stats.update({'entries': entries, 'bytes': size})
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read {self.table} cache size: {str(e)}")
+        return stats
+
+class ExtractionCache(_LRUCacheStore):
+    """
+    Content-addressed cache of whole-document extraction results. Entries are
+    keyed by the PDF's SHA-256 digest plus the OCR method.
+    """
+
+    table = "documents"
+    columns = ("text TEXT NOT NULL", "title TEXT")
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    @staticmethod
+    def make_key(digest: str, ocr_method: str) -> str:
+        """Build the cache key for a document digest and OCR method."""
+        return f"v{EXTRACTION_CACHE_VERSION}:{ocr_method}:{digest}"
+
+    def get(self, digest: str, ocr_method: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Look up a cached extraction result.
+
+        Args:
+            digest: SHA-256 hex digest of the PDF
+            ocr_method: OCR method the result was produced with
+
+        Returns:
+            Tuple of (text, title) on a hit, None on a miss
+        """
+        key = self.make_key(digest, ocr_method)
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT text, title FROM documents WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._record(0, 1)
+                    return None
+                conn.execute("UPDATE documents SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._record(1, 0)
+                return row[0], row[1]
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache lookup failed: {str(e)}")
+            return None
+
+    def put(self, digest: str, ocr_method: str, text: str, title: Optional[str]) -> None:
+        """
+        Store an extraction result and evict old entries if the cache is over budget.
+
+        Args:
+            digest: SHA-256 hex digest of the PDF
+            ocr_method: OCR method the result was produced with
+            text: Cleaned document text
+            title: Document title, if any
+        """
+        key = self.make_key(digest, ocr_method)
+        size = len(text.encode('utf-8')) + len((title or "").encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (key, text, title, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, title, size, time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Extraction cache store failed: {str(e)}")
+
+class PageOCRCache(_LRUCacheStore):
+    """
+    Cache of OCR text per page, keyed by page_content_digest, so pages shared
+    between near-duplicate uploads are only OCR'd once.
+    """
+
+    table = "pages"
+    columns = ("text TEXT NOT NULL",)
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR, max_bytes: int = PAGE_OCR_CACHE_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Look up the OCR text of several pages at once.
+
+        Args:
+            keys: Page digests
+
+        Returns:
+            Dictionary mapping each cached digest to its OCR text
+        """
+        found = {}
+        try:
+            with self._lock, self._connect() as conn:
+                # Stay well below SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i + 500]
+                    placeholders = ", ".join("?" * len(batch))
+                    found.update(conn.execute(
+                        f"SELECT key, text FROM pages WHERE key IN ({placeholders})", batch
+                    ).fetchall())
+                if found:
+                    now = time.time()
+                    conn.executemany("UPDATE pages SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+                self._record(len(found), len(keys) - len(found))
+        except sqlite3.Error as e:
+            logger.warning(f"Page OCR cache lookup failed: {str(e)}")
+        return found
+
+    def put_many(self, entries: Dict[str, str]) -> None:
+        """
+        Store the OCR text of several pages and evict old entries if over budget.
+
+        Args:
+            entries: Dictionary mapping page digest to OCR text
+        """
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [(key, text, len(text.encode('utf-8')), now) for key, text in entries.items()]
+        try:
+            with self._lock, self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pages (key, text, size, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Page OCR cache store failed: {str(e)}")
+
+# Shared cache instances (created on first use)
+_caches = {}
+_caches_lock = threading.Lock()
+
+def _get_cache(cache_class):
+    if not EXTRACTION_CACHE_ENABLED:
+        return None
+
+    with _caches_lock:
+        if cache_class not in _caches:
+            try:
+                _caches[cache_class] = cache_class()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"{cache_class.__name__} unavailable: {str(e)}")
+                return None
+        return _caches[cache_class]
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the shared extraction cache, or None if caching is disabled or unavailable."""
+    return _get_cache(ExtractionCache)
+
+def get_page_ocr_cache() -> Optional[PageOCRCache]:
+    """Return the shared page OCR cache, or None if caching is disabled or unavailable."""
+    return _get_cache(PageOCRCache)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and sizes of the extraction caches for monitoring."""
+    stats = {'enabled': EXTRACTION_CACHE_ENABLED}
+    for name, cache in (('documents', get_extraction_cache()), ('pages', get_page_ocr_cache())):
+        if cache:
+            stats[name] = cache.stats()
+    return stats
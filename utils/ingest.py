@@ -0,0 +1,135 @@
+import os
+import re
+import hashlib
+import logging
+from typing import NamedTuple, BinaryIO, Optional
+import PyPDF2
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Upload ingestion configuration from environment variables
+INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", str(1024 * 1024)))  # bytes read and written per step
+INGEST_MAX_BYTES = int(os.environ.get("MAX_CONTENT_LENGTH", "33554432"))  # same limit as the Flask app (32MB)
+INGEST_MAX_PAGES = int(os.environ.get("INGEST_MAX_PAGES", "2000"))  # 0 disables the page limit
+
+# Page tree nodes: "<< /Type /Pages /Kids [...] /Count N >>" in any key order
+_PAGES_DICT = re.compile(rb'<<(?:(?!<<|>>).){0,4096}?/Type\s*/Pages\b(?:(?!<<|>>).){0,4096}?>>', re.DOTALL)
+_PAGE_COUNT = re.compile(rb'/Count\s+(\d+)')
+# Bytes carried over between chunks so a dictionary split across a chunk boundary is still seen
+_SCAN_OVERLAP = 16 * 1024
+
+class UploadRejectedError(Exception):
+    """Raised when an upload is refused; the partial file has already been removed."""
+
+class UploadTooLargeError(UploadRejectedError):
+    """Raised when an upload exceeds the size or page limit."""
+
+class InvalidPDFError(UploadRejectedError):
+    """Raised when an upload is not a readable PDF."""
+
+class IngestedUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+    page_count: int
+
+class _PageCountScanner:
+    """
+    Estimate a PDF's page count from the raw bytes while they stream past, by
+    taking the largest /Count of the page tree nodes. Page trees stored inside
+    compressed object streams are invisible to it, so callers need a fallback.
+    """
+
+    def __init__(self):
+        self.page_count = 0
+        self._tail = b''
+
+    def feed(self, chunk: bytes) -> None:
+        window = self._tail + chunk
+        for match in _PAGES_DICT.finditer(window):
+            count = _PAGE_COUNT.search(match.group(0))
+            if count:
+                self.page_count = max(self.page_count, int(count.group(1)))
+        self._tail = window[-_SCAN_OVERLAP:]
+
+def _count_pages(path: str) -> int:
+    """Count pages with PyPDF2, which only reads the cross-reference table and page tree."""
+    with open(path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def ingest_upload(stream: BinaryIO, dest_path: str, max_bytes: Optional[int] = None,
+                  max_pages: Optional[int] = None, chunk_size: int = INGEST_CHUNK_SIZE) -> IngestedUpload:
+    """
+    Stream an uploaded PDF to disk in chunks. The SHA-256 digest, size and page
+    count are computed in the same pass, so the payload is never held in memory
+    as a whole. The file only appears at dest_path once it has been accepted.
+
+    Args:
+        stream: Readable binary stream of the upload
+        dest_path: Where to store the PDF
+        max_bytes: Largest accepted upload (defaults to INGEST_MAX_BYTES)
+        max_pages: Largest accepted page count (defaults to INGEST_MAX_PAGES, 0 disables)
+        chunk_size: Bytes read per step
+
+    Returns:
+        IngestedUpload with the stored path, size, digest and page count
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds the size or page limit
+        InvalidPDFError: If the upload is not a readable PDF
+    """
+    max_bytes = INGEST_MAX_BYTES if max_bytes is None else max_bytes
+    max_pages = INGEST_MAX_PAGES if max_pages is None else max_pages
+    partial_path = f"{dest_path}.part"
+
+    digest = hashlib.sha256()
+    scanner = _PageCountScanner()
+    size = 0
+
+    try:
+        with open(partial_path, 'wb') as out:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                if size == 0 and b'%PDF-' not in chunk[:1024]:
+                    raise InvalidPDFError("File is not a PDF")
+
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(f"Upload is larger than the {max_bytes} byte limit")
+
+                digest.update(chunk)
+                scanner.feed(chunk)
+                out.write(chunk)
+
+        if size == 0:
+            raise InvalidPDFError("File is empty")
+
+        page_count = scanner.page_count
+        if not page_count:
+            # Page tree is compressed (PDF 1.5+ object streams); ask the parser instead
+            try:
+                page_count = _count_pages(partial_path)
+            except Exception as e:
+                raise InvalidPDFError(f"PDF could not be read: {str(e)}")
+
+        if not page_count:
+            raise InvalidPDFError("PDF has no pages")
+        if max_pages and page_count > max_pages and scanner.page_count:
+            # Incremental updates can leave stale, larger page trees behind; confirm before refusing
+            page_count = _count_pages(partial_path)
+        if max_pages and page_count > max_pages:
+            raise UploadTooLargeError(f"PDF has {page_count} pages, the limit is {max_pages}")
+
+        os.replace(partial_path, dest_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    upload = IngestedUpload(dest_path, size, digest.hexdigest(), page_count)
+    logger.info(f"Ingested {dest_path}: {size} bytes, {page_count} pages, sha256 {upload.sha256[:12]}")
+    return upload
@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Callable, Optional, Dict, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Job queue configuration from environment variables
+JOB_QUEUE_DB = os.environ.get("JOB_QUEUE_DB", os.path.join("instance", "job_queue.sqlite"))
+JOB_QUEUE_WORKERS = int(os.environ.get("JOB_QUEUE_WORKERS", "2"))  # jobs run at once per app process
+JOB_QUEUE_MAX_PENDING = int(os.environ.get("JOB_QUEUE_MAX_PENDING", "50"))  # new jobs are refused beyond this
+JOB_QUEUE_MAX_ATTEMPTS = int(os.environ.get("JOB_QUEUE_MAX_ATTEMPTS", "3"))  # runs before a job is given up
+JOB_QUEUE_LEASE_SECONDS = int(os.environ.get("JOB_QUEUE_LEASE_SECONDS", "120"))  # running jobs not renewed within this are resumed
+JOB_QUEUE_POLL_SECONDS = float(os.environ.get("JOB_QUEUE_POLL_SECONDS", "2"))
+JOB_QUEUE_RETENTION_SECONDS = int(os.environ.get("JOB_QUEUE_RETENTION_SECONDS", str(7 * 86400)))  # finished jobs kept for idempotency
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process with the given PID exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class QueueFullError(Exception):
+    """Raised when a new job is refused because too many jobs are already waiting."""
+
+class JobQueue:
+    """
+    Persistent job queue backed by a SQLite file, with a bounded pool of worker threads.
+
+    Jobs are keyed by a caller-chosen ID, so submitting the same job twice is a no-op.
+    A running job holds a lease that its worker renews; if the process dies, the lease
+    runs out and any queue process sharing the database picks the job up again.
+    """
+
+    def __init__(self, handler: Callable[[str, Dict[str, Any]], None], db_path: str = JOB_QUEUE_DB,
+                 workers: int = JOB_QUEUE_WORKERS, max_pending: int = JOB_QUEUE_MAX_PENDING,
+                 on_failure: Optional[Callable[[str, str], None]] = None):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.on_failure = on_failure
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._threads = []
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are opened explicitly where needed
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def submit(self, job_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a job unless a job with the same ID already exists.
+
+        Args:
+            job_id: Unique job ID (submitting it again has no effect)
+            payload: JSON-serializable arguments for the handler
+
+        Returns:
+            True if the job was queued, False if it was already known
+
+        Raises:
+            QueueFullError: If JOB_QUEUE_MAX_PENDING jobs are already waiting
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone():
+                    conn.execute("COMMIT")
+                    return False
+
+                pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'running')").fetchone()[0]
+                if pending >= self.max_pending:
+                    conn.execute("ROLLBACK")
+                    raise QueueFullError(f"{pending} jobs are already waiting")
+
+                conn.execute(
+                    "INSERT INTO jobs (job_id, payload, state, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                    (job_id, json.dumps(payload), now, now)
+                )
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+        logger.info(f"Queued job {job_id}")
+        self._wakeup.set()
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the queue record of a job (state, attempts, last error, payload), or None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT state, attempts, last_error, created_at, updated_at, payload FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        job = dict(zip(('state', 'attempts', 'last_error', 'created_at', 'updated_at'), row[:5]))
+        job['payload'] = json.loads(row[5])
+        return job
+
+    def start(self) -> None:
+        """Start the worker threads and the lease renewal thread."""
+        if self._threads:
+            return
+
+        self._recover_orphans()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-queue-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._renew_leases, name="job-queue-leases", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Job queue started with {self.workers} workers ({self.owner})")
+
+    def stop(self) -> None:
+        """Ask the worker threads to exit once their current job is finished."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _recover_orphans(self) -> None:
+        """Make jobs left running by a dead process on this host claimable right away."""
+        host = socket.gethostname()
+        try:
+            with self._connect() as conn:
+                owners = [row[0] for row in conn.execute("SELECT DISTINCT owner FROM jobs WHERE state = 'running'")]
+                for owner in owners:
+                    owner_host, _, owner_pid = (owner or "").rpartition(':')
+                    if owner_host != host or not owner_pid.isdigit() or _pid_alive(int(owner_pid)):
+                        continue
+                    conn.execute(
+                        "UPDATE jobs SET lease_expires_at = 0 WHERE state = 'running' AND owner = ?", (owner,)
+                    )
+                    logger.info(f"Recovering jobs left running by {owner}")
+        except sqlite3.Error as e:
+            logger.error(f"Could not recover orphaned jobs: {str(e)}")
+
+    def _claim(self) -> Optional[tuple]:
+        """
+        Atomically take the oldest queued job, or a running job whose lease expired.
+
+        Returns:
+            Tuple of (job_id, payload, attempts), or None if there is nothing to do
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("""
+                    SELECT job_id, payload, attempts FROM jobs
+                    WHERE state = 'queued' OR (state = 'running' AND lease_expires_at < ?)
+                    ORDER BY created_at LIMIT 1
+                """, (now,)).fetchone()
+
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                job_id, payload, attempts = row
+                if attempts >= JOB_QUEUE_MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET state = 'failed', last_error = ?, updated_at = ? WHERE job_id = ?",
+                        ("Gave up after too many attempts", now, job_id)
+                    )
+                    conn.execute("COMMIT")
+                    self._report_failure(job_id, "Gave up after too many attempts")
+                    return self._claim()
+
+                conn.execute("""
+                    UPDATE jobs SET state = 'running', attempts = attempts + 1, owner = ?,
+                        lease_expires_at = ?, updated_at = ?
+                    WHERE job_id = ?
+                """, (self.owner, now + JOB_QUEUE_LEASE_SECONDS, now, job_id))
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+
+        if attempts:
+            logger.info(f"Resuming job {job_id} (attempt {attempts + 1})")
+        return job_id, json.loads(payload), attempts + 1
+
+    def _finish(self, job_id: str, state: str, error: str = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, lease_expires_at = NULL, updated_at = ? WHERE job_id = ?",
+                (state, error, now, job_id)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?",
+                (now - JOB_QUEUE_RETENTION_SECONDS,)
+            )
+
+    def _report_failure(self, job_id: str, error: str) -> None:
+        logger.error(f"Job {job_id} failed: {error}")
+        if self.on_failure:
+            try:
+                self.on_failure(job_id, error)
+            except Exception as e:
+                logger.error(f"Error in job failure callback for {job_id}: {str(e)}")
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim a job: {str(e)}")
+                claimed = None
+
+            if claimed is None:
+                # Wake up early when a job is submitted in this process
+                self._wakeup.wait(JOB_QUEUE_POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+
+            job_id, payload, attempt = claimed
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                self.handler(job_id, payload)
+                self._finish(job_id, 'done')
+            except Exception as e:
+                if attempt >= JOB_QUEUE_MAX_ATTEMPTS:
+                    self._finish(job_id, 'failed', str(e))
+                    self._report_failure(job_id, str(e))
+                else:
+                    logger.warning(f"Job {job_id} failed on attempt {attempt}, requeueing: {str(e)}")
+                    self._finish(job_id, 'queued', str(e))
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
+
+    def _renew_leases(self) -> None:
+        # Renew well before expiry so a slow database write never loses a live job
+        while not self._stopping.wait(JOB_QUEUE_LEASE_SECONDS / 3):
+            with self._running_lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND owner = ? AND state = 'running'",
+                        [(time.time() + JOB_QUEUE_LEASE_SECONDS, job_id, self.owner) for job_id in running]
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Could not renew job leases: {str(e)}")
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Job status configuration from environment variables
+JOB_STATUS_BACKEND = os.environ.get("JOB_STATUS_BACKEND", "sqlite")  # "sqlite" (shared across workers) or "memory"
+JOB_STATUS_DB = os.environ.get("JOB_STATUS_DB", os.path.join("instance", "job_status.sqlite"))
+JOB_STATUS_TTL = int(os.environ.get("JOB_STATUS_TTL", "86400"))  # seconds a job status is kept after its last update
+
+class InMemoryJobStatusStore:
+    """
+    Job status store kept in a dict inside the current process.
+    Only correct when the app runs as a single process.
+    """
+
+    def __init__(self, ttl: int = JOB_STATUS_TTL):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job's status, or None if unknown or expired."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._jobs[job_id]
+                return None
+            return dict(entry[0])
+
+    def set(self, job_id: str, status: Dict[str, Any]) -> None:
+        """Replace the job's status."""
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job_id] = (dict(status), time.time() + self.ttl)
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Merge fields into the job's status atomically and return the new status."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            status = dict(entry[0]) if entry and entry[1] >= time.time() else {}
+            status.update(fields)
+            self._jobs[job_id] = (status, time.time() + self.ttl)
+            return dict(status)
+
+    def delete(self, job_id: str) -> None:
+        """Forget the job's status."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        for job_id in [job_id for job_id, entry in self._jobs.items() if entry[1] < now]:
+            del self._jobs[job_id]
+
+class SQLiteJobStatusStore:
+    """
+    Job status store backed by a SQLite file, shared by every worker process
+    on the host. Updates are read-modify-write inside an immediate transaction,
+    so concurrent progress updates never lose each other's fields.
+    """
+
+    def __init__(self, db_path: str = JOB_STATUS_DB, ttl: int = JOB_STATUS_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._last_purge = 0.0
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_status (
+                    job_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS job_status_expires_at ON job_status (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, transactions are opened explicitly where needed
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status, or None if unknown or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM job_status WHERE job_id = ? AND expires_at >= ?", (job_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, job_id: str, status: Dict[str, Any]) -> None:
+        """Replace the job's status."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_status (job_id, data, expires_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(status), time.time() + self.ttl)
+            )
+            self._maybe_purge(conn)
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Merge fields into the job's status atomically and return the new status."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT data FROM job_status WHERE job_id = ? AND expires_at >= ?", (job_id, now)
+                ).fetchone()
+                status = json.loads(row[0]) if row else {}
+                status.update(fields)
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_status (job_id, data, expires_at) VALUES (?, ?, ?)",
+                    (job_id, json.dumps(status), now + self.ttl)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def delete(self, job_id: str) -> None:
+        """Forget the job's status."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_status WHERE job_id = ?", (job_id,))
+
+    def _maybe_purge(self, conn: sqlite3.Connection) -> None:
+        # Expired rows are already invisible to reads, so deleting them once a minute is enough
+        now = time.time()
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            conn.execute("DELETE FROM job_status WHERE expires_at < ?", (now,))
+
+def get_job_status_store(backend: str = JOB_STATUS_BACKEND):
+    """
+    Create the job status store selected by JOB_STATUS_BACKEND.
+    Falls back to the in-process store if the shared store cannot be opened.
+    """
+    if backend == "sqlite":
+        try:
+            return SQLiteJobStatusStore()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Could not open job status database {JOB_STATUS_DB}, using in-memory status: {str(e)}")
+    elif backend != "memory":
+        logger.warning(f"Unknown job status backend '{backend}', using in-memory status")
+    return InMemoryJobStatusStore()
+
+class LazyJobStatusStore:
+    """
+    Job status store that opens the store selected by JOB_STATUS_BACKEND on
+    first use, so importing a module that holds one creates no database.
+    """
+
+    def __init__(self, backend: str = JOB_STATUS_BACKEND):
+        self.backend = backend
+        self._store = None
+        self._lock = threading.Lock()
+
+    def _get_store(self):
+        with self._lock:
+            if self._store is None:
+                self._store = get_job_status_store(self.backend)
+            return self._store
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status, or None if unknown or expired."""
+        return self._get_store().get(job_id)
+
+    def set(self, job_id: str, status: Dict[str, Any]) -> None:
+        """Replace the job's status."""
+        self._get_store().set(job_id, status)
+
+    def update(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Merge fields into the job's status atomically and return the new status."""
+        return self._get_store().update(job_id, **fields)
+
+    def delete(self, job_id: str) -> None:
+        """Forget the job's status."""
+        self._get_store().delete(job_id)
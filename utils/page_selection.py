@@ -0,0 +1,229 @@
+import os
+import re
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any
+import PyPDF2
+
+from utils.pdf_document import PDFDocument
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# "3", "10-20", "40-" (to the end) or "-5" (from the start), separated by commas
+_RANGE_PART = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$|^\s*(\d+)\s*$')
+PAGE_RANGE_PATTERN = r'^\s*(\d*\s*-\s*\d*|\d+)(\s*,\s*(\d*\s*-\s*\d*|\d+))*\s*$'
+
+class PageSelectionError(ValueError):
+    """Raised when a page range or outline section does not match the document."""
+
+def parse_page_range(spec: str, total_pages: int) -> List[int]:
+    """
+    Parse a 1-based page range such as "1-5, 8, 12-" into page indexes.
+
+    Args:
+        spec: Comma-separated pages and ranges; open ranges run to the first or last page
+        total_pages: Number of pages in the document
+
+    Returns:
+        Sorted, de-duplicated list of zero-based page indexes
+
+    Raises:
+        PageSelectionError: If the range is malformed or outside the document
+    """
+    pages = set()
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        match = _RANGE_PART.match(part)
+        if not match or part.strip() == '-':
+            raise PageSelectionError(f"Invalid page range '{part.strip()}'")
+
+        if match.group(3):
+            first = last = int(match.group(3))
+        else:
+            first = int(match.group(1)) if match.group(1) else 1
+            last = int(match.group(2)) if match.group(2) else total_pages
+
+        if first < 1 or last > total_pages or first > total_pages:
+            raise PageSelectionError(f"Page range '{part.strip()}' is outside the document (pages 1-{total_pages})")
+        if first > last:
+            raise PageSelectionError(f"Invalid page range '{part.strip()}': {first} comes after {last}")
+        pages.update(range(first - 1, last))
+
+    if not pages:
+        raise PageSelectionError("Page range is empty")
+    return sorted(pages)
+
+def format_page_range(page_numbers: List[int]) -> str:
+    """
+    Format page indexes as a compact 1-based range, the inverse of parse_page_range.
+
+    Args:
+        page_numbers: Zero-based page indexes
+
+    Returns:
+        Range string such as "1-5,8"
+    """
+    parts = []
+    first = last = None
+    for page_num in sorted(set(page_numbers)) + [None]:
+        if first is not None and page_num == last + 1:
+            last = page_num
+            continue
+        if first is not None:
+            parts.append(str(first + 1) if first == last else f"{first + 1}-{last + 1}")
+        first = last = page_num
+    return ",".join(parts)
+
+def get_outline(document: PDFDocument) -> List[Dict[str, Any]]:
+    """
+    Read the bookmarks (outline) of a PDF with the pages each one covers.
+    A bookmark runs until the next bookmark at the same or a higher level.
+
+    Args:
+        document: Opened PDF document
+
+    Returns:
+        List of dictionaries with title, level, first_page and last_page (1-based),
+        in document order; empty if the PDF has no usable outline
+    """
+    reader = document.reader
+    entries = []
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                # Children follow their parent entry
+                walk(item, level + 1)
+                continue
+            try:
+                page_num = reader.get_destination_page_number(item)
+            except Exception as e:
+                logger.warning(f"Skipping outline entry without a page: {str(e)}")
+                continue
+            if page_num is not None and page_num >= 0:
+                entries.append({'title': str(item.title or "").strip(), 'level': level, 'first_page': page_num + 1})
+
+    try:
+        walk(reader.outline, 0)
+    except Exception as e:
+        logger.warning(f"Could not read outline of {document.path}: {str(e)}")
+        return []
+
+    _set_last_pages(entries, document.page_count)
+    return entries
+
+def _set_last_pages(entries: List[Dict[str, Any]], total_pages: int) -> None:
+    """
+    Set each entry's last_page: the page before the next bookmark at the same or a
+    higher level that starts on a later page. One reverse pass keeps, per level,
+    the start of the closest following bookmark and where that bookmark's own
+    section ends (for bookmarks that start on the same page).
+    """
+    following = {}
+    for entry in reversed(entries):
+        ends = [
+            start if start > entry['first_page'] else end
+            for level, (start, end) in following.items() if level <= entry['level']
+        ]
+        end = min(ends, default=total_pages + 1)
+        entry['last_page'] = end - 1
+        following[entry['level']] = (entry['first_page'], end)
+
+def find_outline_section(document: PDFDocument, title: str) -> Dict[str, Any]:
+    """
+    Find a bookmark by title, ignoring case and spacing. An exact match wins over
+    a title that starts with the given text, which wins over one that contains it.
+
+    Args:
+        document: Opened PDF document
+        title: Bookmark title, e.g. "Chapter 3"
+
+    Returns:
+        Outline entry as returned by get_outline
+
+    Raises:
+        PageSelectionError: If no bookmark matches
+    """
+    wanted = " ".join(title.split()).lower()
+    outline = get_outline(document)
+    if not outline:
+        raise PageSelectionError("This PDF has no bookmarks to select a section from")
+
+    for matches in (
+        lambda name: name == wanted,
+        lambda name: name.startswith(wanted),
+        lambda name: wanted in name
+    ):
+        for entry in outline:
+            if matches(" ".join(entry['title'].split()).lower()):
+                return entry
+    raise PageSelectionError(f"No bookmark named '{title}' in this PDF")
+
+def resolve_page_selection(document: PDFDocument, page_range: Optional[str] = None,
+                           outline_title: Optional[str] = None) -> Optional[List[int]]:
+    """
+    Turn a requested page range or bookmark into the pages to process.
+
+    Args:
+        document: Opened PDF document
+        page_range: 1-based page range, see parse_page_range
+        outline_title: Title of a bookmark whose pages are selected
+
+    Returns:
+        Sorted zero-based page indexes, or None to process the whole document
+
+    Raises:
+        PageSelectionError: If the selection is invalid for this document
+    """
+    page_range = (page_range or "").strip()
+    outline_title = (outline_title or "").strip()
+    if page_range and outline_title:
+        raise PageSelectionError("Select either a page range or a bookmark, not both")
+
+    if outline_title:
+        section = find_outline_section(document, outline_title)
+        logger.info(f"Bookmark '{section['title']}' covers pages {section['first_page']}-{section['last_page']}")
+        pages = list(range(section['first_page'] - 1, section['last_page']))
+    elif page_range:
+        pages = parse_page_range(page_range, document.page_count)
+    else:
+        return None
+
+    return None if len(pages) == document.page_count else pages
+
+@contextmanager
+def open_page_selection(document: PDFDocument, page_numbers: Optional[List[int]]):
+    """
+    Open the selected pages of a PDF as a document of their own, so every later
+    stage (text extraction, OCR, external tools) only sees those pages. Only the
+    selected pages and the objects they reference are copied. The temporary
+    file is removed on exit.
+
+    Args:
+        document: Opened PDF document
+        page_numbers: Zero-based page indexes, or None for the whole document
+
+    Yields:
+        PDFDocument with only the selected pages (the original document if all pages are selected)
+    """
+    if page_numbers is None or len(page_numbers) == document.page_count:
+        yield document
+        return
+
+    writer = PyPDF2.PdfWriter()
+    for page_num in page_numbers:
+        writer.add_page(document.reader.pages[page_num])
+
+    temp_fd, temp_path = tempfile.mkstemp(suffix='.pdf', dir=os.path.dirname(os.path.abspath(document.path)))
+    try:
+        with os.fdopen(temp_fd, 'wb') as out:
+            writer.write(out)
+        logger.info(f"Selected {len(page_numbers)} of {document.page_count} pages of {document.path}")
+        with PDFDocument(temp_path) as selection:
+            yield selection
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
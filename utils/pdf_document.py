@@ -0,0 +1,144 @@
+import io
+import mmap
+import hashlib
+import logging
+import threading
+from typing import Optional, List, Dict, Any
+import PyPDF2
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class _MappedStream(io.RawIOBase):
+    """Read-only file object over a memory-mapped PDF, with its own read position."""
+
+    def __init__(self, data: memoryview):
+        self._data = data
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        chunk = self._data[self._position:self._position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._data)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._data.release()
+        super().close()
+
+class PDFDocument:
+    """
+    An uploaded PDF opened once for the whole processing pipeline.
+
+    The file is memory-mapped and parsed by PyPDF2 a single time; the page
+    count, metadata, content digest and extracted page text are cached on the
+    object, so extraction, OCR and storage stages share one parse instead of
+    each reopening the file. Worker processes and external tools (pdftoppm,
+    ocrmypdf, pdftotext) still open `path` themselves.
+    """
+
+    def __init__(self, path: str, sha256: Optional[str] = None):
+        """
+        Args:
+            path: Path to the PDF file
+            sha256: Digest of the file if already known (e.g. computed during upload)
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+
+        self._reader = None
+        self._sha256 = sha256
+        self._lock = threading.RLock()
+
+        # Text of each page as extracted natively, and after OCR/normalization
+        self.native_page_texts: Optional[List[str]] = None
+        self.page_texts: Optional[List[str]] = None
+
+        # Preflight classification (native/ocr/hybrid), see pdf_processor.classify_document
+        self.preflight: Optional[Dict[str, Any]] = None
+
+        # Set when OCR failed or was cancelled for any page, so partial text is never cached
+        self.ocr_incomplete = False
+
+    def __enter__(self) -> 'PDFDocument':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes."""
+        return len(self._mmap)
+
+    @property
+    def reader(self) -> PyPDF2.PdfReader:
+        """PyPDF2 reader over the mapped file, parsed on first use."""
+        with self._lock:
+            if self._reader is None:
+                # The reader owns the mmap's read position; other consumers use open_stream()
+                self._reader = PyPDF2.PdfReader(self._mmap)
+            return self._reader
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages in the document."""
+        return len(self.reader.pages)
+
+    @property
+    def title(self) -> Optional[str]:
+        """Title from the document info dictionary, if any."""
+        metadata = self.reader.metadata
+        if metadata and hasattr(metadata, 'title') and metadata.title:
+            return metadata.title
+        return None
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 hex digest of the file contents, computed once."""
+        with self._lock:
+            if self._sha256 is None:
+                self._sha256 = hashlib.sha256(self._mmap).hexdigest()
+            return self._sha256
+
+    def open_stream(self) -> _MappedStream:
+        """
+        Open an independent read-only stream over the file contents without copying them,
+        e.g. for storing the upload in GridFS.
+        """
+        return _MappedStream(memoryview(self._mmap))
+
+    def close(self) -> None:
+        """Release the memory map and file handle."""
+        with self._lock:
+            self._reader = None
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A stream from open_stream() is still open; the map is released with it
+                logger.warning(f"PDF {self.path} closed while a stream over it is still open")
+            self._file.close()
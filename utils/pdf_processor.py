@@ -2,37 +2,109 @@ import PyPDF2
 import re
 import os
 import logging
+import shutil
+import signal
 import tempfile
 import subprocess
 import threading
 import time
+import random
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from io import BytesIO
 from pathlib import Path
-from typing import Tuple, Optional, List, Dict, Any
+from typing import Tuple, Optional, List, Dict, Any, Callable, Set
 import pytesseract
 from pdf2image import convert_from_path
-from PIL import Image
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 # Azure Document Intelligence imports
-from pypdf import PdfReader, PdfWriter
+from pypdf import PdfReader
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+
+from utils.job_status import LazyJobStatusStore
+from utils.extraction_cache import get_extraction_cache, get_page_ocr_cache, page_content_digest
+from utils.pdf_document import PDFDocument
+from utils.page_selection import open_page_selection
+from utils.process_pools import get_process_pool, discard_process_pool
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Global variable to store PDF processing status
-processing_status = {}
+# Shared PDF processing status store (see JOB_STATUS_BACKEND), opened on first use
+processing_status = LazyJobStatusStore()
 
 # Azure Document Intelligence configuration from environment variables
 AZURE_ENDPOINT = os.environ.get("AZURE_DOC_ENDPOINT")
 AZURE_KEY = os.environ.get("AZURE_DOC_KEY")
 AZURE_CHUNK_SIZE = int(os.environ.get("AZURE_CHUNK_SIZE", "6"))  # pages per split - Azure has limits on document size
+AZURE_MAX_CONCURRENCY = int(os.environ.get("AZURE_MAX_CONCURRENCY", "4"))  # chunk analyses in flight at once
+AZURE_MAX_RETRIES = int(os.environ.get("AZURE_MAX_RETRIES", "5"))  # retries per chunk when throttled
+AZURE_RETRY_BASE_DELAY = float(os.environ.get("AZURE_RETRY_BASE_DELAY", "1.0"))  # seconds, doubled on each retry
+
+# Parallel text extraction configuration
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))  # 1 disables the process pool
+PDF_EXTRACT_PAGES_PER_TASK = int(os.environ.get("PDF_EXTRACT_PAGES_PER_TASK", "20"))  # pages per worker task
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "40"))  # smaller PDFs are extracted serially
+
+# Text extraction backend: "auto" picks the fastest available one (see TEXT_BACKENDS)
+PDF_TEXT_BACKEND = os.environ.get("PDF_TEXT_BACKEND", "auto").lower()
+PDFTOTEXT_TIMEOUT_SECONDS = int(os.environ.get("PDFTOTEXT_TIMEOUT_SECONDS", "120"))  # per pdftotext call
+
+# Pages with fewer extractable characters than this are treated as scanned and OCR'd individually
+PAGE_MIN_TEXT_CHARS = int(os.environ.get("PAGE_MIN_TEXT_CHARS", "25"))
+
+# Preflight OCR-need detection: pages whose text is sampled before any full extraction
+PREFLIGHT_SAMPLE_PAGES = int(os.environ.get("PREFLIGHT_SAMPLE_PAGES", "5"))
+
+# Local OCR rasterization settings
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+OCR_MAX_PAGES_IN_MEMORY = max(1, int(os.environ.get("OCR_MAX_PAGES_IN_MEMORY", "4")))  # rendered pages held at once
+
+# Maximum time to wait for ocrmypdf before it is killed
+OCR_TIMEOUT_SECONDS = int(os.environ.get("OCR_TIMEOUT_SECONDS", "300"))
+
+# ocrmypdf settings
+OCRMYPDF_JOBS = int(os.environ.get("OCRMYPDF_JOBS", str(os.cpu_count() or 1)))  # CPU cores ocrmypdf may use
+OCRMYPDF_MODE = os.environ.get("OCRMYPDF_MODE", "skip")  # "skip" pages with text, "redo" old OCR layers, or "force"
+OCRMYPDF_ARCHIVE_DIR = os.environ.get("OCRMYPDF_ARCHIVE_DIR", "")  # keep OCR'd PDFs here; empty writes sidecar text only
+OCRMYPDF_MODE_FLAGS = {'skip': '--skip-text', 'redo': '--redo-ocr', 'force': '--force-ocr'}
+_OCRMYPDF_SKIPPED_PAGE = re.compile(r'^\s*\[OCR skipped on page\(s\) ([\d\-, ]+)\]\s*$')  # one section per run of skipped pages
 
-def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool = False) -> Tuple[str, Optional[str]]:
+# Local OCR worker pool settings
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 1)))  # 1 runs Tesseract in-process
+OCR_OMP_THREAD_LIMIT = os.environ.get("OCR_OMP_THREAD_LIMIT", "1")  # Tesseract threads per worker process
+
+# Pages per section handed to on_section callbacks while a document is still being extracted
+PIPELINE_SECTION_PAGES = int(os.environ.get("PIPELINE_SECTION_PAGES", "20"))
+
+# Running header/footer detection
+HEADER_FOOTER_EDGE_LINES = int(os.environ.get("HEADER_FOOTER_EDGE_LINES", "3"))  # lines checked at the top and bottom of each page
+HEADER_FOOTER_MIN_RATIO = float(os.environ.get("HEADER_FOOTER_MIN_RATIO", "0.6"))  # share of pages a line must repeat on
+HEADER_FOOTER_MIN_PAGES = 3
+
+# Precompiled text normalization patterns
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+_INLINE_WHITESPACE = re.compile(r'[^\S\n]+')
+_DIGITS = re.compile(r'\d+')
+_CLEAN_PATTERN = re.compile(
+    r'(?P<page_number>\s+(?:Page\s+)?\d+\s+of\s+\d+\s+|\s+Page\s+\d+\s+)'  # page numbers (common formats)
+    r'|(?P<whitespace>\s+)'
+    r'|(?P<control>[\x00-\x08\x0B\x0C\x0E-\x1F\x7F])'
+)
+
+def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool = False,
+                          document: PDFDocument = None,
+                          on_section: Callable[[str, int, int], None] = None,
+                          pages: List[int] = None) -> Tuple[str, Optional[str]]:
     """
     Extract text and title from a PDF file.
     If standard text extraction fails or returns minimal text, OCR is used.
@@ -41,6 +113,12 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
         pdf_path: Path to the PDF file
         pdf_id: Unique ID for tracking processing status
         use_azure_ocr: Whether to use Azure Document Intelligence for OCR processing
+        document: Already opened document to reuse (opened from pdf_path otherwise)
+        on_section: Called with (cleaned_text, first_page, end_page) for consecutive
+            sections of the document, in page order, as soon as each section's text
+            is final. Documents that are OCR'd as a whole arrive at the end.
+            With `pages`, page numbers count within the selection.
+        pages: Zero-based indexes of the only pages to extract and OCR (all pages by default)
         
     Returns:
         Tuple of (extracted_text, title)
@@ -48,37 +126,63 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
     try:
         # Initialize processing status if pdf_id provided
         if pdf_id:
-            processing_status[pdf_id] = {
+            processing_status.set(pdf_id, {
                 'step': 1,
                 'progress': 10,
                 'status': 'Extracting text from PDF',
                 'complete': False
-            }
+            })
         
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        # Parse the file once and share it with every stage below; a page selection
+        # is cut out into its own document first so no stage touches the other pages
+        with (nullcontext(document) if document else PDFDocument(pdf_path)) as source, \
+                open_page_selection(source, pages) as document:
+            # Serve repeat uploads of the same file from the content-addressed cache
+            cache = get_extraction_cache()
+            text_backend = get_text_backend()
+            # Backends lay out text slightly differently, so each gets its own cache entries
+            ocr_method = f"{'azure' if use_azure_ocr else 'local'}:{text_backend}"
+            if cache:
+                cached = cache.get(document.sha256, ocr_method)
+                if cached:
+                    logger.info(f"Extraction cache hit for {document.sha256[:12]} ({ocr_method})")
+                    if pdf_id:
+                        processing_status.update(
+                            pdf_id,
+                            step=3,
+                            progress=70,
+                            status='Generating questions',
+                            ocr_complete=True,
+                            cache_hit=True
+                        )
+                    if on_section and cached[0]:
+                        on_section(cached[0], 0, document.page_count)
+                    return cached
             
             # Try to extract title from document info
-            title = None
-            if reader.metadata and hasattr(reader.metadata, 'title') and reader.metadata.title:
-                title = reader.metadata.title
-            
-            # Extract text from all pages using PyPDF2
-            text = ""
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text() or ""
-                text += page_text + "\n"
-                
-                # Update progress if pdf_id provided
-                if pdf_id:
-                    progress = min(30, 10 + int(20 * (page_num + 1) / len(reader.pages)))
-                    processing_status[pdf_id]['progress'] = progress
+            title = source.title
+            
+            # Decide from page resources and a small text sample whether a full extraction pass is worth it
+            preflight = classify_document(document)
+            if pdf_id:
+                processing_status.update(pdf_id, preflight=preflight)
+            
+            if preflight['route'] == 'ocr':
+                # Scanned document: skip native extraction and go straight to OCR
+                logger.info("Preflight found no usable text layer, skipping native text extraction")
+                page_texts = [""] * document.page_count
+            else:
+                # Extract text from all pages with the selected backend (page-sharded across processes for large PDFs)
+                page_texts = extract_page_texts(document, pdf_id, backend=text_backend)
+            text = "".join(page_text + "\n" for page_text in page_texts)
+            
+            # Running header/footer signatures (None: learned from all pages once they are final)
+            repeated = None
+            sections_sent = False
             
             # If pdf_id provided, update status
             if pdf_id:
-                processing_status[pdf_id]['step'] = 2
-                processing_status[pdf_id]['status'] = 'Analyzing text quality'
+                processing_status.update(pdf_id, step=2, status='Analyzing text quality')
             
             # Check if text extraction was successful
             has_sufficient_text = len(text.strip()) >= 100
@@ -88,16 +192,15 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
                 if use_azure_ocr:
                     logger.info("Using Azure Document Intelligence for OCR processing...")
                     if pdf_id:
-                        processing_status[pdf_id]['status'] = 'Running Azure Document Intelligence OCR'
-                        processing_status[pdf_id]['progress'] = 35
+                        processing_status.update(pdf_id, status='Running Azure Document Intelligence OCR', progress=35)
                     
                     # Run Azure OCR
-                    azure_text = extract_text_with_azure_ocr(pdf_path, pdf_id)
+                    azure_text = extract_text_with_azure_ocr(document, pdf_id)
                     if azure_text:
                         text = azure_text
+                        page_texts = None
                         if pdf_id:
-                            processing_status[pdf_id]['progress'] = 65
-                            processing_status[pdf_id]['ocr_complete'] = True
+                            processing_status.update(pdf_id, progress=65, ocr_complete=True)
                     else:
                         logger.warning("Azure OCR failed. Falling back to local OCR methods.")
                         # Fall back to regular OCR methods
@@ -105,37 +208,93 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
                 if not use_azure_ocr or not azure_text:
                     logger.info("Using advanced OCR processing due to insufficient text...")
                     
-                    # Run OCR in a separate thread if tracking status
+                    # Run OCR in the background if tracking status, and wait for its result
                     if pdf_id:
-                        thread = threading.Thread(target=process_with_ocrmypdf, args=(pdf_path, pdf_id))
-                        thread.daemon = True
-                        thread.start()
-                        
-                        # Wait for OCR to complete or timeout after 5 minutes
-                        start_time = time.time()
-                        while time.time() - start_time < 300:  # 5 minutes timeout
-                            if processing_status[pdf_id].get('ocr_complete', False):
-                                break
-                            time.sleep(1)
+                        ocr_job = start_ocrmypdf(document, pdf_id)
+                        try:
+                            ocr_page_texts = ocr_job.result(timeout=OCR_TIMEOUT_SECONDS)
+                        except FuturesTimeoutError:
+                            logger.error(f"OCR did not finish within {OCR_TIMEOUT_SECONDS} seconds, cancelling")
+                            ocr_job.cancel()
+                            ocr_page_texts = []
+                        if not ocr_page_texts:
+                            # Timed out, cancelled or failed: only the native text is left
+                            document.ocr_incomplete = True
                         
-                        # Use OCR output if available, otherwise fallback to original text
-                        ocr_path = f"{pdf_path}_ocr.pdf"
-                        if os.path.exists(ocr_path):
-                            ocr_text = extract_text_from_ocr_pdf(ocr_path)
-                            if ocr_text:
-                                text = ocr_text
+                        # Use OCR output if available, keeping the native text of pages ocrmypdf skipped
+                        if any(ocr_page_texts):
+                            for page_num, ocr_text in enumerate(ocr_page_texts[:len(page_texts)]):
+                                if ocr_text is not None:
+                                    page_texts[page_num] = normalize_page_text(ocr_text)
+                                elif not page_texts[page_num]:
+                                    # Skipped for its text layer, which preflight routing did not extract
+                                    page_texts[page_num] = normalize_page_text(
+                                        document.reader.pages[page_num].extract_text() or ""
+                                    )
+                            text = "".join(page_text + "\n" for page_text in page_texts)
                     else:
                         # Synchronous OCR for non-tracked PDFs
-                        ocr_text = extract_text_with_ocr(pdf_path)
+                        ocr_text = extract_text_with_ocr(document)
                         if ocr_text:
                             text = ocr_text
+                            page_texts = None
+                        else:
+                            document.ocr_incomplete = True
             else:
+                # Route only the pages without a usable text layer to OCR
+                ocr_pages = classify_low_density_pages(page_texts, document)
+                if pdf_id:
+                    processing_status.update(pdf_id, page_routing={
+                        'native': len(page_texts) - len(ocr_pages),
+                        'ocr': [page_num + 1 for page_num in ocr_pages]
+                    })
+                
+                if ocr_pages:
+                    logger.info(f"Running OCR on {len(ocr_pages)} of {len(page_texts)} pages without a text layer")
+                    if pdf_id:
+                        processing_status.update(
+                            pdf_id,
+                            status=f'Running OCR on {len(ocr_pages)} scanned pages',
+                            progress=35
+                        )
+                
+                if on_section:
+                    # Learn running headers from the native pages, so each section can be
+                    # finished and handed on as soon as its own OCR pages are done
+                    repeated = find_repeated_lines(page_texts)
+                    ocr_done = 0
+                    for start, end in _iter_sections(len(page_texts)):
+                        section_ocr_pages = [page_num for page_num in ocr_pages if start <= page_num < end]
+                        if section_ocr_pages:
+                            progress_range = (
+                                35 + int(30 * ocr_done / len(ocr_pages)),
+                                35 + int(30 * (ocr_done + len(section_ocr_pages)) / len(ocr_pages))
+                            )
+                            ocr_texts = ocr_pdf_pages(document, section_ocr_pages, pdf_id, progress_range=progress_range)
+                            for page_num, page_text in ocr_texts.items():
+                                page_texts[page_num] = normalize_page_text(page_text)
+                            ocr_done += len(section_ocr_pages)
+                        on_section(
+                            clean_text("\n".join(strip_repeated_lines(page_texts[start:end], repeated))), start, end
+                        )
+                    sections_sent = True
+                    text = "".join(page_text + "\n" for page_text in page_texts)
+                elif ocr_pages:
+                    # Merge OCR output back into the native text in page order
+                    ocr_texts = ocr_pdf_pages(document, ocr_pages, pdf_id)
+                    for page_num, page_text in ocr_texts.items():
+                        page_texts[page_num] = normalize_page_text(page_text)
+                    text = "".join(page_text + "\n" for page_text in page_texts)
+                
                 # Skip OCR for PDFs with sufficient extractable text
-                logger.info("PDF contains sufficient extractable text. Skipping OCR processing.")
+                logger.info("PDF contains sufficient extractable text. Skipping full-document OCR processing.")
                 if pdf_id:
-                    processing_status[pdf_id]['progress'] = 65
-                    processing_status[pdf_id]['status'] = 'Text extraction successful. Proceeding with analysis.'
-                    processing_status[pdf_id]['ocr_complete'] = True
+                    processing_status.update(
+                        pdf_id,
+                        progress=65,
+                        status='Text extraction successful. Proceeding with analysis.',
+                        ocr_complete=True
+                    )
             
             # If no title was found in metadata, try to extract from first page
             if not title:
@@ -144,14 +303,36 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
                 if first_lines and len(first_lines[0]) < 100:  # Assume titles aren't too long
                     title = first_lines[0].strip()
             
+            # Drop running headers/footers while the page boundaries are still known
+            if page_texts is not None:
+                document.page_texts = strip_repeated_lines(page_texts, repeated)
+                text = "\n".join(document.page_texts)
+            
             # Clean up the text
             text = clean_text(text)
             
+            # Hand on the sections the OCR paths above could not deliver early
+            if on_section and not sections_sent:
+                if document.page_texts is not None and page_texts is not None:
+                    for start, end in _iter_sections(len(document.page_texts)):
+                        on_section(clean_text("\n".join(document.page_texts[start:end])), start, end)
+                elif text:
+                    on_section(text, 0, document.page_count)
+            
             # Update status if pdf_id provided
             if pdf_id:
-                processing_status[pdf_id]['step'] = 3
-                processing_status[pdf_id]['progress'] = 70
-                processing_status[pdf_id]['status'] = 'Generating questions'
+                processing_status.update(
+                    pdf_id,
+                    step=3,
+                    progress=70,
+                    status='Generating questions'
+                )
+            
+            # Text with failed or cancelled OCR pages would be served to every later upload
+            if cache and text and not document.ocr_incomplete:
+                cache.put(document.sha256, ocr_method, text, title)
+            elif document.ocr_incomplete:
+                logger.warning("OCR did not complete, not caching the extracted text")
             
             logger.info(f"Successfully extracted {len(text)} characters from PDF")
             return text, title
@@ -161,87 +342,348 @@ def extract_text_from_pdf(pdf_path: str, pdf_id: str = None, use_azure_ocr: bool
         
         # Update status if pdf_id provided
         if pdf_id:
-            processing_status[pdf_id]['status'] = f"Error: {str(e)}"
+            processing_status.update(pdf_id, status=f"Error: {str(e)}")
         
         return "", None
 
-def extract_text_with_azure_ocr(pdf_path: str, pdf_id: str = None) -> str:
+def _pypdf2_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract raw text from pages [start, end) with PyPDF2."""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[page_num].extract_text() or "" for page_num in range(start, end)]
+
+def _pypdf_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract raw text from pages [start, end) with pypdf."""
+    with open(pdf_path, 'rb') as file:
+        reader = PdfReader(file)
+        return [reader.pages[page_num].extract_text() or "" for page_num in range(start, end)]
+
+def _pdftotext_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract raw text from pages [start, end) with poppler's pdftotext."""
+    result = subprocess.run(
+        ['pdftotext', '-q', '-enc', 'UTF-8', '-f', str(start + 1), '-l', str(end), pdf_path, '-'],
+        capture_output=True,
+        timeout=PDFTOTEXT_TIMEOUT_SECONDS,
+        check=True
+    )
+    # pdftotext ends every page with a form feed
+    pages = result.stdout.decode('utf-8', errors='replace').split('\f')[:end - start]
+    pages.extend([""] * (end - start - len(pages)))
+    return pages
+
+# Registered text extraction backends, fastest first as measured by `python -m utils.benchmark backends`:
+# name -> (page range extractor, availability check)
+TEXT_BACKENDS = {
+    'pdftotext': (_pdftotext_page_range, lambda: shutil.which('pdftotext') is not None),
+    'pypdf2': (_pypdf2_page_range, lambda: True),
+    'pypdf': (_pypdf_page_range, lambda: True),
+}
+
+def available_text_backends() -> List[str]:
+    """Return the names of the text extraction backends usable on this host, fastest first."""
+    return [name for name, (_, is_available) in TEXT_BACKENDS.items() if is_available()]
+
+def get_text_backend(name: str = None) -> str:
     """
-    Extract text from a PDF using Azure Document Intelligence (formerly Form Recognizer).
-    This method splits large PDFs into chunks to handle Azure's size limits.
+    Resolve the text extraction backend to use.
+    
+    Args:
+        name: Backend name or "auto" (defaults to PDF_TEXT_BACKEND)
+        
+    Returns:
+        Name of an available backend; "auto" and unavailable backends resolve
+        to the fastest available one
+    """
+    name = (name or PDF_TEXT_BACKEND).lower()
+    available = available_text_backends()
+    if name in available:
+        return name
+    if name != 'auto':
+        logger.warning(f"Text backend '{name}' is unknown or unavailable, using {available[0]}")
+    return available[0]
+
+def _extract_page_range(pdf_path: str, start: int, end: int, backend: str = 'pypdf2') -> List[str]:
+    """
+    Extract and normalize text from pages [start, end) of a PDF. Runs inside a
+    worker process, so the file is opened and parsed independently of the caller.
     
     Args:
         pdf_path: Path to the PDF file
+        start: Index of the first page to extract
+        end: Index one past the last page to extract
+        backend: Name of the text extraction backend
+        
+    Returns:
+        List with the text of each page in the range
+    """
+    extract_range = TEXT_BACKENDS[backend][0]
+    return [normalize_page_text(page_text) for page_text in extract_range(pdf_path, start, end)]
+
+def extract_page_texts(document: PDFDocument, pdf_id: str = None, max_workers: int = None,
+                       backend: str = None) -> List[str]:
+    """
+    Extract the normalized text of every page of a PDF, in page order.
+    Large documents are split into page ranges that are extracted in parallel
+    by a process pool; small documents are extracted serially, parsing the file
+    once for all pages. If the selected backend fails, PyPDF2 is used with the
+    document's reader. The result is cached on the document.
+    
+    Args:
+        document: Opened PDF document
+        pdf_id: Unique ID for tracking processing status
+        max_workers: Number of worker processes (defaults to PDF_EXTRACT_WORKERS)
+        backend: Text extraction backend (defaults to PDF_TEXT_BACKEND)
+        
+    Returns:
+        List with the text of each page
+    """
+    if document.native_page_texts is not None:
+        return list(document.native_page_texts)
+    
+    pdf_path = document.path
+    total_pages = document.page_count
+    max_workers = max_workers or PDF_EXTRACT_WORKERS
+    backend = get_text_backend(backend)
+    page_texts = [""] * total_pages
+    
+    def report_progress(pages_done):
+        if pdf_id and total_pages:
+            processing_status.update(pdf_id, progress=min(30, 10 + int(20 * pages_done / total_pages)))
+    
+    if max_workers > 1 and total_pages >= PDF_PARALLEL_MIN_PAGES:
+        try:
+            pool = get_process_pool('cpu', max_workers)
+            futures = {}
+            for start in range(0, total_pages, PDF_EXTRACT_PAGES_PER_TASK):
+                end = min(start + PDF_EXTRACT_PAGES_PER_TASK, total_pages)
+                futures[pool.submit(_extract_page_range, pdf_path, start, end, backend)] = start
+            
+            logger.info(f"Extracting {total_pages} pages in {len(futures)} parallel tasks with {backend}")
+            
+            # Place each range back at its page offset so the document keeps its page order
+            pages_done = 0
+            for future in as_completed(futures):
+                start = futures[future]
+                range_texts = future.result()
+                page_texts[start:start + len(range_texts)] = range_texts
+                pages_done += len(range_texts)
+                report_progress(pages_done)
+            
+            document.native_page_texts = page_texts
+            return list(page_texts)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                discard_process_pool('cpu')
+            logger.warning(f"Parallel text extraction failed, falling back to serial extraction: {str(e)}")
+    
+    # In-process, every backend parses the file once for all pages
+    if backend == 'pdftotext':
+        try:
+            page_texts = _extract_page_range(pdf_path, 0, total_pages, backend)
+            report_progress(total_pages)
+            document.native_page_texts = page_texts
+            return list(page_texts)
+        except Exception as e:
+            logger.warning(f"Text extraction with {backend} failed, falling back to PyPDF2: {str(e)}")
+    elif backend == 'pypdf':
+        try:
+            with document.open_stream() as pdf_stream:
+                reader = PdfReader(pdf_stream)
+                for page_num in range(total_pages):
+                    page_texts[page_num] = normalize_page_text(reader.pages[page_num].extract_text() or "")
+                    report_progress(page_num + 1)
+            document.native_page_texts = page_texts
+            return list(page_texts)
+        except Exception as e:
+            logger.warning(f"Text extraction with {backend} failed, falling back to PyPDF2: {str(e)}")
+    
+    for page_num in range(total_pages):
+        page_texts[page_num] = normalize_page_text(document.reader.pages[page_num].extract_text() or "")
+        report_progress(page_num + 1)
+    
+    document.native_page_texts = page_texts
+    return list(page_texts)
+
+def _page_resource_kinds(page) -> Tuple[bool, bool]:
+    """
+    Inspect a page's resource dictionary without parsing its content stream.
+    
+    Returns:
+        Tuple of (has_fonts, has_images); images inside form XObjects count too
+    """
+    resources = page.get('/Resources')
+    resources = resources.get_object() if resources else {}
+    fonts = resources.get('/Font')
+    has_fonts = bool(fonts and fonts.get_object())
+    
+    has_images = False
+    xobjects = resources.get('/XObject')
+    for xobject in (xobjects.get_object().values() if xobjects else ()):
+        xobject = xobject.get_object()
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            has_images = True
+        elif subtype == '/Form':
+            form_fonts, form_images = _page_resource_kinds(xobject)
+            has_fonts = has_fonts or form_fonts
+            has_images = has_images or form_images
+    return has_fonts, has_images
+
+def classify_document(document: PDFDocument, sample_pages: int = None) -> Dict[str, Any]:
+    """
+    Decide whether a PDF needs OCR before extracting its full text.
+    Every page's /Font and /XObject resources are inspected, and text is
+    extracted from a handful of pages that have fonts to check that their
+    text layer is usable. The result is cached on the document.
+    
+    Args:
+        document: Opened PDF document
+        sample_pages: Number of pages whose text is sampled (defaults to PREFLIGHT_SAMPLE_PAGES)
+        
+    Returns:
+        Dictionary with the route ('native', 'ocr' or 'hybrid') and the evidence for it
+    """
+    if document.preflight is not None:
+        return document.preflight
+    
+    started = time.perf_counter()
+    sample_pages = PREFLIGHT_SAMPLE_PAGES if sample_pages is None else sample_pages
+    
+    font_pages = []
+    image_only_pages = 0
+    for page_num, page in enumerate(document.reader.pages):
+        has_fonts, has_images = _page_resource_kinds(page)
+        if has_fonts:
+            font_pages.append(page_num)
+        elif has_images:
+            image_only_pages += 1
+    
+    # Spread the sample evenly over the pages that claim to have text
+    sample_size = min(sample_pages, len(font_pages))
+    sampled = sorted({
+        font_pages[round(i * (len(font_pages) - 1) / max(1, sample_size - 1))]
+        for i in range(sample_size)
+    })
+    sample_chars = [
+        len(re.sub(r'\s+', '', document.reader.pages[page_num].extract_text() or ""))
+        for page_num in sampled
+    ]
+    chars_per_page = sum(sample_chars) / len(sample_chars) if sample_chars else 0
+    
+    if not font_pages or chars_per_page < PAGE_MIN_TEXT_CHARS:
+        route = 'ocr'
+    elif image_only_pages:
+        route = 'hybrid'
+    else:
+        route = 'native'
+    
+    document.preflight = {
+        'route': route,
+        'pages': document.page_count,
+        'font_pages': len(font_pages),
+        'image_only_pages': image_only_pages,
+        'sampled_pages': [page_num + 1 for page_num in sampled],
+        'sample_chars_per_page': round(chars_per_page, 1),
+        'seconds': round(time.perf_counter() - started, 4)
+    }
+    logger.info(f"Preflight classified {document.path} as {route}: {document.preflight}")
+    return document.preflight
+
+def classify_low_density_pages(page_texts: List[str], document: PDFDocument = None, min_chars: int = None) -> List[int]:
+    """
+    Find pages whose extracted text is too sparse to be a real text layer
+    (typically scanned pages inside an otherwise digital PDF).
+    
+    Args:
+        page_texts: Extracted text of each page
+        document: Opened PDF document; when given, only sparse pages that draw an
+            image are returned, so blank pages are not sent to OCR
+        min_chars: Minimum number of non-whitespace characters for a native page
+        
+    Returns:
+        Sorted list of zero-based page indexes that need OCR
+    """
+    min_chars = PAGE_MIN_TEXT_CHARS if min_chars is None else min_chars
+    return [
+        page_num for page_num, page_text in enumerate(page_texts)
+        if len(re.sub(r'\s+', '', page_text)) < min_chars
+        and (document is None or _page_resource_kinds(document.reader.pages[page_num])[1])
+    ]
+
+def extract_text_with_azure_ocr(document: PDFDocument, pdf_id: str = None, client: DocumentAnalysisClient = None) -> str:
+    """
+    Extract text from a PDF using Azure Document Intelligence (formerly Form Recognizer).
+    This method splits large PDFs into chunks to handle Azure's size limits and
+    analyzes the chunks concurrently.
+    
+    Args:
+        document: Opened PDF document
         pdf_id: Optional tracking ID for status updates
+        client: Document analysis client to use (defaults to one built from AZURE_ENDPOINT/AZURE_KEY)
         
     Returns:
         Extracted text as string
     """
     try:
-        logger.info(f"Starting Azure Document Intelligence OCR for {pdf_path}")
+        logger.info(f"Starting Azure Document Intelligence OCR for {document.path}")
         
-        # Create a chunks directory if it doesn't exist
-        os.makedirs("chunks", exist_ok=True)
-        
-        # Read the PDF
-        reader = PdfReader(pdf_path)
+        # Split the already parsed document
+        reader = document.reader
         total_pages = len(reader.pages)
         
         if pdf_id:
-            processing_status[pdf_id]['status'] = f'Splitting PDF into chunks for Azure OCR ({total_pages} pages)'
+            processing_status.update(pdf_id, status=f'Splitting PDF into chunks for Azure OCR ({total_pages} pages)')
         
-        # Split into chunks to handle Azure's size limits
-        chunk_paths = []
+        # Split into in-memory chunks to handle Azure's size limits
+        chunks = []
         for i in range(0, total_pages, AZURE_CHUNK_SIZE):
-            writer = PdfWriter()
+            writer = PyPDF2.PdfWriter()
             
             # Add pages to this chunk
             for p in range(i, min(i + AZURE_CHUNK_SIZE, total_pages)):
                 writer.add_page(reader.pages[p])
-                
-            # Generate unique chunk filename
-            chunk_filename = f"chunks/chunk_{i//AZURE_CHUNK_SIZE + 1}_{os.path.basename(pdf_path)}.pdf"
-            with open(chunk_filename, "wb") as out_f:
-                writer.write(out_f)
-            chunk_paths.append(chunk_filename)
             
-        logger.info(f"Split PDF into {len(chunk_paths)} chunks for Azure processing")
+            buffer = BytesIO()
+            writer.write(buffer)
+            chunks.append(buffer.getvalue())
+            
+        logger.info(f"Split PDF into {len(chunks)} chunks for Azure processing")
         
         # Initialize Azure client
-        client = DocumentAnalysisClient(
-            endpoint=AZURE_ENDPOINT, 
-            credential=AzureKeyCredential(AZURE_KEY)
-        )
-        
-        # Process each chunk with Azure
-        all_text = []
-        for idx, chunk_file in enumerate(chunk_paths):
-            if pdf_id:
-                progress = 35 + min(30, int(30 * idx / len(chunk_paths)))
-                processing_status[pdf_id]['progress'] = progress
-                processing_status[pdf_id]['status'] = f'OCR processing chunk {idx+1}/{len(chunk_paths)}'
-                
-            logger.info(f"OCR processing chunk {idx+1}/{len(chunk_paths)}: {chunk_file}")
+        if client is None:
+            client = DocumentAnalysisClient(
+                endpoint=AZURE_ENDPOINT, 
+                credential=AzureKeyCredential(AZURE_KEY)
+            )
+        
+        # Submit the chunks concurrently, with at most AZURE_MAX_CONCURRENCY in flight
+        chunk_lines = [[] for _ in chunks]
+        chunks_done = 0
+        with ThreadPoolExecutor(max_workers=max(1, AZURE_MAX_CONCURRENCY)) as executor:
+            futures = {
+                executor.submit(_analyze_chunk_with_retry, client, chunk_data, idx, len(chunks)): idx
+                for idx, chunk_data in enumerate(chunks)
+            }
             
-            try:
-                with open(chunk_file, "rb") as fd:
-                    poller = client.begin_analyze_document("prebuilt-read", document=fd)
-                result = poller.result()
-                
-                for page in result.pages:
-                    for line in page.lines:
-                        all_text.append(line.content)
-            except Exception as chunk_error:
-                logger.error(f"Error processing chunk {idx+1}: {str(chunk_error)}")
-                # Continue with next chunk even if one fails
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    chunk_lines[idx] = future.result()
+                except Exception as chunk_error:
+                    logger.error(f"Error processing chunk {idx+1}: {str(chunk_error)}")
+                    # Continue with the other chunks even if one fails
                 
-        # Clean up chunk files
-        for chunk_file in chunk_paths:
-            try:
-                if os.path.exists(chunk_file):
-                    os.remove(chunk_file)
-            except Exception as e:
-                logger.warning(f"Could not remove chunk file {chunk_file}: {str(e)}")
+                chunks_done += 1
+                if pdf_id:
+                    progress = 35 + min(30, int(30 * chunks_done / len(chunks)))
+                    processing_status.update(
+                        pdf_id,
+                        progress=progress,
+                        status=f'OCR processed chunk {chunks_done}/{len(chunks)}'
+                    )
+        
+        # Reassemble the lines in chunk order
+        all_text = [line for lines in chunk_lines for line in lines]
                 
         # Combine all text
         full_text = "\n".join(all_text)
@@ -253,167 +695,574 @@ def extract_text_with_azure_ocr(pdf_path: str, pdf_id: str = None) -> str:
         logger.error(f"Error performing Azure OCR on PDF: {str(e)}")
         return ""
 
-def process_with_ocrmypdf(pdf_path: str, pdf_id: str) -> None:
+def _is_throttling_error(error: Exception) -> bool:
+    """Check whether an Azure error means the request should be retried later."""
+    return isinstance(error, HttpResponseError) and error.status_code in (429, 503)
+
+def _retry_after_seconds(error: HttpResponseError) -> Optional[float]:
+    """Read the Retry-After header from a throttled Azure response, if present."""
+    try:
+        return float(error.response.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def _analyze_chunk_with_retry(client: DocumentAnalysisClient, chunk_data: bytes, idx: int, total_chunks: int) -> List[str]:
+    """
+    Analyze one PDF chunk with Azure, retrying with exponential backoff when throttled.
+    
+    Args:
+        client: Document analysis client
+        chunk_data: The chunk PDF as bytes
+        idx: Zero-based chunk index (for logging)
+        total_chunks: Number of chunks in the document (for logging)
+        
+    Returns:
+        List of text lines recognized in the chunk
+    """
+    attempt = 0
+    while True:
+        logger.info(f"OCR processing chunk {idx+1}/{total_chunks} ({len(chunk_data)} bytes)")
+        try:
+            # A fresh stream per attempt, since a failed upload may have consumed it
+            poller = client.begin_analyze_document("prebuilt-read", document=BytesIO(chunk_data))
+            result = poller.result()
+            
+            return [line.content for page in result.pages for line in page.lines]
+        except Exception as e:
+            if not _is_throttling_error(e) or attempt >= AZURE_MAX_RETRIES:
+                raise
+            
+            delay = _retry_after_seconds(e) or AZURE_RETRY_BASE_DELAY * (2 ** attempt)
+            delay += random.uniform(0, AZURE_RETRY_BASE_DELAY)
+            attempt += 1
+            logger.warning(f"Azure throttled chunk {idx+1}, retrying in {delay:.1f}s (attempt {attempt}/{AZURE_MAX_RETRIES})")
+            time.sleep(delay)
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Kill a subprocess started in its own session together with its children (ghostscript, tesseract)."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
+class OCRJob:
+    """
+    Handle for an OCR run in the background. The OCR text is delivered through
+    a future, and cancel() kills the underlying ocrmypdf subprocess.
+    """
+    
+    def __init__(self):
+        self.future = Future()
+        self._process = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+    
+    def attach(self, process: subprocess.Popen) -> bool:
+        """Register the running subprocess; returns False (and kills it) if the job was already cancelled."""
+        with self._lock:
+            self._process = process
+            if self._cancelled:
+                _kill_process_group(process)
+                return False
+            return True
+    
+    def result(self, timeout: float = None) -> str:
+        """Wait for the OCR text; raises concurrent.futures.TimeoutError if it is not ready in time."""
+        return self.future.result(timeout=timeout)
+    
+    def cancel(self) -> None:
+        """Stop the OCR run and kill its subprocess if one is running."""
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None and self._process.poll() is None:
+                logger.warning(f"Killing OCR subprocess {self._process.pid}")
+                _kill_process_group(self._process)
+        self.future.cancel()
+
+def start_ocrmypdf(document: PDFDocument, pdf_id: str) -> OCRJob:
+    """
+    Start ocrmypdf processing on a background thread.
+    
+    Args:
+        document: Opened PDF document
+        pdf_id: Unique ID for tracking processing status
+        
+    Returns:
+        OCRJob whose future resolves to the per-page OCR text
+    """
+    job = OCRJob()
+    
+    def run():
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            job.future.set_result(process_with_ocrmypdf(document, pdf_id, job))
+        except Exception as e:
+            job.future.set_exception(e)
+    
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return job
+
+def _build_ocrmypdf_command(pdf_path: str, sidecar_path: str, output_path: str) -> List[str]:
+    """Build the ocrmypdf command line for sidecar-text OCR."""
+    cmd = ['ocrmypdf', '--sidecar', sidecar_path, '--jobs', str(OCRMYPDF_JOBS)]
+    if OCRMYPDF_MODE in OCRMYPDF_MODE_FLAGS:
+        cmd.append(OCRMYPDF_MODE_FLAGS[OCRMYPDF_MODE])
+    else:
+        logger.warning(f"Unknown OCRMYPDF_MODE '{OCRMYPDF_MODE}', using ocrmypdf defaults")
+    
+    # Without an archive copy only the sidecar text is produced, no output PDF is written
+    if output_path == '-':
+        cmd.extend(['--output-type', 'none'])
+    
+    cmd.extend([pdf_path, output_path])
+    return cmd
+
+def _parse_ocrmypdf_sidecar(sidecar_text: str, total_pages: int) -> List[Optional[str]]:
+    """
+    Split ocrmypdf sidecar text into pages (pages are separated by form feeds).
+    A run of pages ocrmypdf skipped shares one section, e.g. "[OCR skipped on page(s) 1-3]".
+    
+    Returns:
+        Text of each page, or None for pages ocrmypdf skipped because they already had text
+    """
+    pages = []
+    for section in sidecar_text.split('\f'):
+        match = _OCRMYPDF_SKIPPED_PAGE.match(section)
+        if not match:
+            pages.append(section)
+            continue
+        skipped = 0
+        for part in match.group(1).split(','):
+            first, _, last = part.strip().partition('-')
+            if first:
+                skipped += int(last or first) - int(first) + 1
+        pages.extend([None] * max(1, skipped))
+    
+    pages = pages[:total_pages]
+    pages.extend([""] * (total_pages - len(pages)))
+    return pages
+
+def process_with_ocrmypdf(document: PDFDocument, pdf_id: str, job: OCRJob = None) -> List[Optional[str]]:
     """
     Process PDF with ocrmypdf for better OCR results.
+    The text is read from ocrmypdf's sidecar output; an OCR'd PDF is only written
+    when OCRMYPDF_ARCHIVE_DIR is set. Falls back to Tesseract OCR if ocrmypdf fails.
     
     Args:
-        pdf_path: Path to the PDF file
+        document: Opened PDF document
         pdf_id: Unique ID for tracking processing status
+        job: Optional OCRJob used to cancel the subprocess
+        
+    Returns:
+        OCR text of each page, None for pages skipped because they already have
+        text (empty list if OCR failed or was cancelled)
     """
+    pdf_path = document.path
     try:
+        total_pages = document.page_count
+        
         # Update status
-        processing_status[pdf_id]['status'] = 'Running advanced OCR with ocrmypdf'
-        processing_status[pdf_id]['progress'] = 35
-        
-        # Output path for OCR'd PDF
-        output_path = f"{pdf_path}_ocr.pdf"
-        
-        # Run ocrmypdf command
-        cmd = ['ocrmypdf', pdf_path, output_path]
-        logger.info(f"Running OCR command: {' '.join(cmd)}")
-        
-        # Execute ocrmypdf
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # Process output
-        total_pages = 0
-        processed_pages = 0
-        
-        for line in process.stdout:
-            logger.info(f"OCRMYPDF: {line.strip()}")
-            
-            # Try to parse progress information
-            if 'Scanning contents:' in line:
-                pages_match = re.search(r'(\d+)/(\d+)', line)
-                if pages_match:
-                    processed_pages = int(pages_match.group(1))
-                    total_pages = int(pages_match.group(2))
-                    
-            # Update progress based on processed pages
-            if total_pages > 0:
-                progress = 35 + min(30, int(30 * processed_pages / total_pages))
-                processing_status[pdf_id]['progress'] = progress
+        processing_status.update(pdf_id, status='Running advanced OCR with ocrmypdf', progress=35)
         
-        # Wait for process to complete
-        process.wait()
+        output_path = '-'
+        if OCRMYPDF_ARCHIVE_DIR:
+            os.makedirs(OCRMYPDF_ARCHIVE_DIR, exist_ok=True)
+            output_path = os.path.join(OCRMYPDF_ARCHIVE_DIR, f"{os.path.basename(pdf_path)}_ocr.pdf")
         
-        # Check if successful
-        if process.returncode == 0:
-            logger.info(f"ocrmypdf completed successfully: {output_path}")
-            processing_status[pdf_id]['progress'] = 65
-        else:
-            error_output = process.stderr.read()
-            logger.error(f"ocrmypdf failed: {error_output}")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sidecar_path = os.path.join(temp_dir, 'sidecar.txt')
             
-            # Fallback to regular OCR if ocrmypdf fails
-            logger.info("Falling back to regular OCR")
-            extract_text_with_ocr(pdf_path)
-        
-        # Mark OCR as complete
-        processing_status[pdf_id]['ocr_complete'] = True
+            # Run ocrmypdf command
+            cmd = _build_ocrmypdf_command(pdf_path, sidecar_path, output_path)
+            logger.info(f"Running OCR command: {' '.join(cmd)}")
+            
+            # Execute ocrmypdf (progress is reported on stderr, merged so neither pipe can fill up)
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                start_new_session=True
+            )
+            if job and not job.attach(process):
+                return []
+            
+            # Process output
+            processed_pages = 0
+            output_lines = []
+            
+            for line in process.stdout:
+                logger.info(f"OCRMYPDF: {line.strip()}")
+                output_lines.append(line)
+                
+                # Try to parse progress information
+                if 'Scanning contents:' in line:
+                    pages_match = re.search(r'(\d+)/(\d+)', line)
+                    if pages_match:
+                        processed_pages = int(pages_match.group(1))
+                        
+                # Update progress based on processed pages
+                if processed_pages and total_pages:
+                    progress = 35 + min(30, int(30 * processed_pages / total_pages))
+                    processing_status.update(pdf_id, progress=progress)
+            
+            # Wait for process to complete
+            process.wait()
+            
+            if job and job.cancelled:
+                logger.warning("ocrmypdf was cancelled")
+                return []
+            
+            # Check if successful
+            if process.returncode == 0:
+                with open(sidecar_path, encoding='utf-8', errors='replace') as sidecar:
+                    page_texts = _parse_ocrmypdf_sidecar(sidecar.read(), total_pages)
+                
+                logger.info(f"ocrmypdf completed successfully ({sum(1 for t in page_texts if t is not None)} pages OCR'd)")
+                processing_status.update(pdf_id, progress=65, ocr_complete=True)
+                return page_texts
+            
+            logger.error(f"ocrmypdf failed: {''.join(output_lines[-20:])}")
         
     except Exception as e:
         logger.error(f"Error in ocrmypdf processing: {str(e)}")
-        processing_status[pdf_id]['ocr_complete'] = True
-        
-        # Fallback to regular OCR if ocrmypdf fails
-        extract_text_with_ocr(pdf_path)
+    
+    if job and job.cancelled:
+        return []
+    
+    # Fallback to regular OCR if ocrmypdf fails
+    logger.info("Falling back to regular OCR")
+    try:
+        total_pages = document.page_count
+        ocr_texts = ocr_pdf_pages(document, list(range(total_pages)), pdf_id, job=job)
+        return [ocr_texts.get(page_num, "") for page_num in range(total_pages)]
+    except Exception as e:
+        logger.error(f"Error performing OCR on PDF: {str(e)}")
+        return []
+    finally:
+        processing_status.update(pdf_id, ocr_complete=True)
 
-def extract_text_from_ocr_pdf(ocr_pdf_path: str) -> str:
+def extract_text_with_ocr(document: PDFDocument, pdf_id: str = None, job: OCRJob = None) -> str:
     """
-    Extract text from a PDF that has already been processed with OCR.
+    Extract text from a PDF using OCR (for scanned documents).
+    Pages are rasterized and OCR'd in small windows so memory use stays
+    bounded by OCR_MAX_PAGES_IN_MEMORY rather than the document length.
     
     Args:
-        ocr_pdf_path: Path to the OCR'd PDF file
+        document: Opened PDF document
+        pdf_id: Optional tracking ID for status updates
+        job: Optional OCRJob; OCR stops early once it is cancelled
         
     Returns:
         Extracted text as string
     """
     try:
-        with open(ocr_pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from all pages
-            text = ""
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                page_text = page.extract_text() or ""
-                text += page_text + "\n"
-            
-            return text
+        logger.info(f"Starting OCR processing for {document.path}")
+        
+        total_pages = document.page_count
+        page_texts = ocr_pdf_pages(document, list(range(total_pages)), pdf_id, job=job)
+        text = "".join(page_texts.get(page_num, "") + "\n" for page_num in range(total_pages))
+        
+        logger.info(f"OCR completed successfully, extracted {len(text)} characters")
+        return text
             
     except Exception as e:
-        logger.error(f"Error extracting text from OCR'd PDF: {str(e)}")
+        logger.error(f"Error performing OCR on PDF: {str(e)}")
         return ""
 
-def extract_text_with_ocr(pdf_path: str) -> str:
+def _iter_sections(total_pages: int, section_pages: int = None):
     """
-    Extract text from a PDF using OCR (for scanned documents).
+    Split a document into consecutive sections of pages.
+    
+    Yields:
+        Tuples of (first_page, end_page) as zero-based, end-exclusive indexes
+    """
+    section_pages = max(1, section_pages or PIPELINE_SECTION_PAGES)
+    for start in range(0, total_pages, section_pages):
+        yield start, min(start + section_pages, total_pages)
+
+def _iter_page_windows(page_numbers: List[int], window_size: int):
+    """
+    Group page indexes into windows of consecutive pages, each at most window_size long.
+    
+    Yields:
+        Tuples of (first_page, last_page) as zero-based inclusive indexes
+    """
+    first = last = None
+    for page_num in sorted(set(page_numbers)):
+        if first is not None and page_num == last + 1 and page_num - first < window_size:
+            last = page_num
+            continue
+        if first is not None:
+            yield first, last
+        first = last = page_num
+    if first is not None:
+        yield first, last
+
+def _page_cache_keys(document: PDFDocument, page_numbers: List[int]) -> Dict[int, str]:
+    """
+    Compute page OCR cache keys for the selected pages of a PDF.
     
     Args:
-        pdf_path: Path to the PDF file
+        document: Opened PDF document
+        page_numbers: Zero-based page indexes
         
     Returns:
-        Extracted text as string
+        Dictionary mapping page index to cache key (pages that could not be fingerprinted are omitted)
     """
+    keys = {}
     try:
-        logger.info(f"Starting OCR processing for {pdf_path}")
+        for page_num in page_numbers:
+            key = page_content_digest(document.reader.pages[page_num], OCR_DPI)
+            if key:
+                keys[page_num] = key
+    except Exception as e:
+        logger.warning(f"Could not compute page OCR cache keys: {str(e)}")
+    return keys
+
+def _init_ocr_worker(omp_thread_limit: str) -> None:
+    """Limit Tesseract's own threading inside each OCR worker process."""
+    os.environ['OMP_THREAD_LIMIT'] = omp_thread_limit
+
+def _ocr_page_window(pdf_path: str, first: int, last: int, dpi: int) -> List[str]:
+    """
+    Rasterize pages [first, last] of a PDF and OCR them with Tesseract.
+    Runs inside an OCR worker process or inline when the pool is disabled.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        first: Zero-based index of the first page
+        last: Zero-based index of the last page (inclusive)
+        dpi: Rasterization resolution
         
-        # Create a temporary directory for the images
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Convert PDF pages to images
-            images = convert_from_path(pdf_path, dpi=300)
-            logger.info(f"Converted PDF to {len(images)} images")
-            
-            # Process each image with OCR
-            text = ""
-            for i, image in enumerate(images):
-                # Save the image temporarily
-                image_path = os.path.join(temp_dir, f'page_{i}.png')
-                image.save(image_path, 'PNG')
-                
-                # Extract text with pytesseract
-                page_text = pytesseract.image_to_string(Image.open(image_path))
-                text += page_text + "\n"
-                
-                # Log progress for longer documents
-                if i > 0 and i % 5 == 0:
-                    logger.info(f"OCR processed {i}/{len(images)} pages")
-                
-            logger.info(f"OCR completed successfully, extracted {len(text)} characters")
-            return text
+    Returns:
+        List with the OCR text of each page in the window
+    """
+    # pdf2image page numbers are 1-based and inclusive
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first + 1, last_page=last + 1)
+    texts = []
+    for image in images:
+        # Hand the image straight to Tesseract, no intermediate PNG file
+        texts.append(pytesseract.image_to_string(image))
+        image.close()
+    return texts
+
+def _finish_page_ocr(document: PDFDocument, page_numbers: List[int], results: Dict[int, str],
+                     fresh: Dict[str, str], page_keys: Dict[int, str], cache) -> Dict[int, str]:
+    """
+    Fill in repeated pages from their OCR'd twin and store new page text in the cache.
+    Marks the document's OCR as incomplete if any requested page has no text.
+    """
+    for page_num, key in page_keys.items():
+        if page_num not in results and key in fresh:
+            results[page_num] = fresh[key]
+    if cache:
+        cache.put_many(fresh)
+    
+    missing = sum(1 for page_num in page_numbers if page_num not in results)
+    if missing:
+        logger.warning(f"OCR failed or was cancelled for {missing}/{len(page_numbers)} pages")
+        document.ocr_incomplete = True
+    return results
+
+def ocr_pdf_pages(document: PDFDocument, page_numbers: List[int], pdf_id: str = None, max_workers: int = None,
+                  job: OCRJob = None, progress_range: Tuple[int, int] = (35, 65)) -> Dict[int, str]:
+    """
+    Run Tesseract OCR on selected pages of a PDF only.
+    Pages found in the page OCR cache are not rendered at all. The remaining
+    consecutive pages are grouped into windows of at most OCR_MAX_PAGES_IN_MEMORY
+    pages. Windows are scheduled onto a pool of OCR worker processes, so at most
+    max_workers windows are rendered at any time; each worker limits Tesseract to
+    OCR_OMP_THREAD_LIMIT threads so the pool does not oversubscribe the CPUs.
+    
+    Args:
+        document: Opened PDF document
+        page_numbers: Zero-based indexes of the pages to OCR
+        pdf_id: Optional tracking ID for status updates
+        max_workers: Number of OCR worker processes (defaults to OCR_WORKERS)
+        job: Optional OCRJob; no further pages are scheduled once it is cancelled
+        progress_range: Status progress reported at the first and last page
+        
+    Returns:
+        Dictionary mapping page index to OCR text (pages that failed are omitted)
+    """
+    pdf_path = document.path
+    max_workers = max_workers or OCR_WORKERS
+    results = {}
+    
+    # Reuse OCR text of pages already seen in this or any other upload
+    cache = get_page_ocr_cache()
+    page_keys = _page_cache_keys(document, page_numbers) if cache and page_numbers else {}
+    if page_keys:
+        cached = cache.get_many(list(set(page_keys.values())))
+        for page_num, key in page_keys.items():
+            if key in cached:
+                results[page_num] = cached[key]
+        if results:
+            logger.info(f"Page OCR cache hit for {len(results)}/{len(page_numbers)} pages")
+    
+    # Pages repeated within the document (same fingerprint) are only OCR'd once
+    pending = []
+    seen_keys = set()
+    for page_num in page_numbers:
+        key = page_keys.get(page_num)
+        if page_num in results or (key and key in seen_keys):
+            continue
+        pending.append(page_num)
+        if key:
+            seen_keys.add(key)
+    
+    windows = list(_iter_page_windows(pending, OCR_MAX_PAGES_IN_MEMORY))
+    fresh = {}
+    
+    def collect(first, last, texts):
+        for offset, page_text in enumerate(texts):
+            results[first + offset] = page_text
+            if first + offset in page_keys:
+                fresh[page_keys[first + offset]] = page_text
+        
+        logger.info(f"OCR processed {len(results)}/{len(page_numbers)} pages")
+        if pdf_id and page_numbers:
+            processing_status.update(
+                pdf_id,
+                progress=progress_range[0] + min(
+                    progress_range[1] - progress_range[0],
+                    int((progress_range[1] - progress_range[0]) * len(results) / len(page_numbers))
+                ),
+                status=f'OCR processed {len(results)}/{len(page_numbers)} pages'
+            )
+    
+    if max_workers > 1 and len(windows) > 1:
+        try:
+            pool = get_process_pool('ocr', max_workers, _init_ocr_worker, (OCR_OMP_THREAD_LIMIT,))
+            futures = {
+                pool.submit(_ocr_page_window, pdf_path, first, last, OCR_DPI): (first, last)
+                for first, last in windows
+            }
             
-    except Exception as e:
-        logger.error(f"Error performing OCR on PDF: {str(e)}")
-        return ""
+            # Results are keyed by page index, so completion order does not matter
+            for future in as_completed(futures):
+                if job and job.cancelled:
+                    for pending_future in futures:
+                        pending_future.cancel()
+                    break
+                first, last = futures[future]
+                try:
+                    collect(first, last, future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error performing OCR on pages {first + 1}-{last + 1}: {str(e)}")
+            
+            return _finish_page_ocr(document, page_numbers, results, fresh, page_keys, cache)
+        except BrokenProcessPool as e:
+            discard_process_pool('ocr')
+            logger.warning(f"OCR worker pool failed, continuing OCR in-process: {str(e)}")
+    
+    for first, last in windows:
+        if job and job.cancelled:
+            break
+        if first in results:
+            continue
+        try:
+            collect(first, last, _ocr_page_window(pdf_path, first, last, OCR_DPI))
+        except Exception as e:
+            logger.error(f"Error performing OCR on pages {first + 1}-{last + 1}: {str(e)}")
+    
+    return _finish_page_ocr(document, page_numbers, results, fresh, page_keys, cache)
 
-def clean_text(text: str) -> str:
+def normalize_page_text(page_text: str) -> str:
     """
-    Clean up extracted PDF text.
+    Normalize the text of a single page as soon as it is extracted: drop control
+    characters, collapse runs of spaces and tabs, and remove blank lines.
+    Line breaks are kept so repeated headers and footers can be found later.
     
     Args:
-        text: Raw text extracted from PDF
+        page_text: Raw text of one page
         
     Returns:
-        Cleaned text
+        Normalized page text, one non-empty line per line
+    """
+    page_text = _INLINE_WHITESPACE.sub(' ', _CONTROL_CHARS.sub('', page_text))
+    return '\n'.join(line.strip() for line in page_text.split('\n') if line.strip())
+
+def _line_signature(line: str) -> str:
+    """Reduce a line to a form that matches across pages (case and page numbers ignored)."""
+    return _DIGITS.sub('#', line.lower())
+
+def _edge_indexes(lines: List[str]) -> Set[int]:
+    """Indexes of the lines checked for running headers/footers at the top and bottom of a page."""
+    return set(range(min(HEADER_FOOTER_EDGE_LINES, len(lines)))) | \
+        set(range(max(0, len(lines) - HEADER_FOOTER_EDGE_LINES), len(lines)))
+
+def find_repeated_lines(page_texts: List[str]) -> Set[str]:
     """
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    Find running headers and footers: signatures of lines near the top or bottom
+    of a page that appear on most non-empty pages of the document.
     
-    # Remove page numbers (common formats)
-    text = re.sub(r'\s+\d+\s+of\s+\d+\s+', ' ', text)
-    text = re.sub(r'\s+Page\s+\d+\s+', ' ', text)
+    Args:
+        page_texts: Normalized text of each page
+        
+    Returns:
+        Set of repeated line signatures (empty if there are too few pages to tell)
+    """
+    page_lines = [page_text.split('\n') for page_text in page_texts if page_text]
+    if len(page_lines) < HEADER_FOOTER_MIN_PAGES:
+        return set()
     
-    # Remove headers/footers that might repeat on every page
-    # This is a simplified approach - real-world PDFs might need more sophisticated cleaning
+    # Frequency index: on how many pages does each edge line signature occur
+    frequency = Counter()
+    for lines in page_lines:
+        frequency.update({_line_signature(lines[i]) for i in _edge_indexes(lines)})
     
-    # Remove unicode control characters
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    threshold = max(HEADER_FOOTER_MIN_PAGES, HEADER_FOOTER_MIN_RATIO * len(page_lines))
+    repeated = {signature for signature, count in frequency.items() if count >= threshold}
+    if repeated:
+        logger.info(f"Found {len(repeated)} repeated header/footer lines")
+    return repeated
+
+def strip_repeated_lines(page_texts: List[str], repeated: Set[str] = None) -> List[str]:
+    """
+    Remove running headers and footers from the top and bottom lines of each page.
     
-    return text.strip()
+    Args:
+        page_texts: Normalized text of each page
+        repeated: Line signatures to remove (defaults to find_repeated_lines(page_texts))
+        
+    Returns:
+        Page texts with the repeated lines removed
+    """
+    if repeated is None:
+        repeated = find_repeated_lines(page_texts)
+    if not repeated:
+        return page_texts
+    
+    stripped = []
+    for page_text in page_texts:
+        lines = page_text.split('\n') if page_text else []
+        edges = _edge_indexes(lines)
+        stripped.append('\n'.join(
+            line for i, line in enumerate(lines)
+            if i not in edges or _line_signature(line) not in repeated
+        ))
+    return stripped
+
+def clean_text(text: str) -> str:
+    """
+    Clean up extracted PDF text in a single pass: collapse whitespace, remove
+    page numbers and drop unicode control characters.
+    
+    Args:
+        text: Raw text extracted from PDF
+        
+    Returns:
+        Cleaned text
+    """
+    return _CLEAN_PATTERN.sub(lambda match: '' if match.lastgroup == 'control' else ' ', text).strip()
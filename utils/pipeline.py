@@ -0,0 +1,186 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Iterable, Optional, Dict, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Pipeline configuration from environment variables
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "4"))  # items buffered between streaming stages
+
+class PipelineCancelled(Exception):
+    """Raised inside a stage when another stage failed and the pipeline is shutting down."""
+
+class Channel:
+    """
+    Bounded queue that streams items from one stage to another. The consumer
+    iterates over it until the producer's stage finishes; a full channel
+    blocks the producer so a slow consumer limits how far ahead it runs.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize: int = PIPELINE_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self._cancelled = threading.Event()
+
+    def put(self, item: Any) -> None:
+        """Add an item, waiting while the channel is full."""
+        while True:
+            if self._cancelled.is_set():
+                raise PipelineCancelled("Pipeline was cancelled")
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> None:
+        """Signal the consumer that no more items will arrive."""
+        try:
+            self.put(self._CLOSED)
+        except PipelineCancelled:
+            pass
+
+    def cancel(self) -> None:
+        """Wake up and fail both ends of the channel."""
+        self._cancelled.set()
+
+    def __iter__(self):
+        while True:
+            if self._cancelled.is_set():
+                raise PipelineCancelled("Pipeline was cancelled")
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is self._CLOSED:
+                return
+            yield item
+
+class _Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], after: Iterable[str],
+                 produces: Iterable[Channel]):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.produces = tuple(produces)
+        self.done = threading.Event()
+        self.failed = False
+
+class Pipeline:
+    """
+    Small dependency graph of job stages. Each stage runs on its own thread as
+    soon as the stages listed in `after` have finished, so independent stages
+    overlap; stages connected by a Channel run concurrently and stream items.
+    If any stage fails, the channels are cancelled, stages that were waiting
+    on it are skipped, and run() raises the first error.
+
+    Stage functions receive a dict with the return values of finished stages.
+    Start and duration of every stage are recorded in `timings` and, when a
+    status store is given, on the job's status as 'stage_timings'.
+    """
+
+    def __init__(self, job_id: Optional[str] = None, status_store=None):
+        self.job_id = job_id
+        self.status_store = status_store
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._stages: Dict[str, _Stage] = {}
+        self._channels = []
+        self._errors = []
+        self._lock = threading.Lock()
+        self._started = None
+
+    def channel(self, maxsize: int = PIPELINE_QUEUE_SIZE) -> Channel:
+        """Create a channel that is cancelled together with the pipeline."""
+        channel = Channel(maxsize)
+        self._channels.append(channel)
+        return channel
+
+    def stage(self, name: str, func: Callable[[Dict[str, Any]], Any], after: Iterable[str] = (),
+              produces: Iterable[Channel] = ()) -> None:
+        """
+        Add a stage.
+
+        Args:
+            name: Unique stage name; its return value is stored under this key
+            func: Called with the results of the finished stages
+            after: Names of the stages that must finish first
+            produces: Channels this stage writes to; they are closed when it finishes
+        """
+        unknown = [dependency for dependency in after if dependency not in self._stages]
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(unknown)}")
+        self._stages[name] = _Stage(name, func, after, produces)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run all stages and wait for them to finish.
+
+        Returns:
+            Dictionary mapping stage name to its return value
+
+        Raises:
+            The first exception raised by a stage
+        """
+        self._started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_stage, args=(stage,), name=f"pipeline-{stage.name}", daemon=True)
+            for stage in self._stages.values()
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.results
+
+    def _run_stage(self, stage: _Stage) -> None:
+        for dependency in stage.after:
+            self._stages[dependency].done.wait()
+        if any(self._stages[dependency].failed for dependency in stage.after):
+            stage.failed = True
+            stage.done.set()
+            return
+
+        started = time.perf_counter()
+        try:
+            result = stage.func(self.results)
+            with self._lock:
+                self.results[stage.name] = result
+            for channel in stage.produces:
+                channel.close()
+        except Exception as e:
+            stage.failed = True
+            with self._lock:
+                self._errors.append(e)
+            if not isinstance(e, PipelineCancelled):
+                logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+            for channel in self._channels:
+                channel.cancel()
+        finally:
+            self._record_timing(stage.name, started)
+            stage.done.set()
+
+    def _record_timing(self, name: str, started: float) -> None:
+        with self._lock:
+            self.timings[name] = {
+                'start': round(started - self._started, 4),
+                'seconds': round(time.perf_counter() - started, 4)
+            }
+            timings = dict(self.timings)
+        if self.status_store is not None and self.job_id:
+            try:
+                self.status_store.update(self.job_id, stage_timings=timings)
+            except Exception as e:
+                logger.warning(f"Could not record stage timings for {self.job_id}: {str(e)}")
@@ -0,0 +1,40 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Shared process pools, keyed by name (created on first use)
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+def get_process_pool(name: str, max_workers: int, initializer=None, initargs=()) -> ProcessPoolExecutor:
+    """
+    Return the shared process pool with the given name, creating it on first use.
+    The size and initializer of the first caller apply to everyone sharing the pool.
+    """
+    with _process_pools_lock:
+        if name not in _process_pools:
+            logger.info(f"Starting {name} pool with {max_workers} worker processes")
+            _process_pools[name] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=initializer,
+                initargs=initargs
+            )
+        return _process_pools[name]
+
+def discard_process_pool(name: str) -> None:
+    """Drop a broken process pool so the next job starts a fresh one."""
+    with _process_pools_lock:
+        pool = _process_pools.pop(name, None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pools() -> None:
+    """Stop all shared pools and wait for their workers to exit."""
+    with _process_pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
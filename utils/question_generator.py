@@ -1,12 +1,18 @@
 import os
 import logging
 import re
-from typing import List, Dict, Any
+import heapq
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Tuple
 import json
 import random
 import math
 from dotenv import load_dotenv
 
+from utils.sentence_similarity import SentenceMatrix
+from utils.process_pools import get_process_pool, discard_process_pool
+
 # Load environment variables
 load_dotenv()
 
@@ -18,13 +24,159 @@ AZURE_API_KEY = os.environ.get("AZURE_OPENAI_API_KEY")
 AZURE_ENDPOINT = os.environ.get("AZURE_OPENAI_ENDPOINT")
 DEFAULT_QUESTIONS_PER_TEST = int(os.environ.get("DEFAULT_QUESTIONS_PER_TEST", "120"))
 
-def generate_questions(text: str, num_questions: int = None) -> List[Dict[str, Any]]:
+# Documents are split into at most this many chunks that questions are spread over
+MAX_CHUNKS = 20
+
+# Chunks of large documents are drafted in parallel by the process pool shared with page extraction
+QUESTION_WORKERS = int(os.environ.get("QUESTION_WORKERS", str(os.cpu_count() or 1)))  # 1 drafts in-process
+QUESTION_PARALLEL_MIN_CHARS = int(os.environ.get("QUESTION_PARALLEL_MIN_CHARS", "1000000"))  # smaller texts are drafted in-process
+
+# Sentences at least this similar to the correct answer are too close to serve as distractors
+DISTRACTOR_MAX_SIMILARITY = 0.9
+NO_DISTRACTOR = "Information not provided in this section of the text."
+
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]+')
+_KEYWORD = re.compile(r'\b[a-zA-Z]{5,}\b')  # Words with 5+ letters
+
+# Common words long enough to match _KEYWORD that never make a useful subject
+STOPWORDS = frozenset("""
+    about above according across after again against almost along already although always among
+    another around because become becomes been before being below between beyond both cannot could
+    during each either enough especially every example first following found further given however
+    including instead itself large later least less likely might more most much must never often
+    other others otherwise perhaps place point possible rather really same several shall should
+    since small something sometimes still such than that their them themselves then there therefore
+    these they thing things third those though three through thus together under until upon using
+    usually various very well were what whatever when where whether which while whole whose within
+    without would years
+""".split())
+
+# Number of top document keywords that generic questions pick subjects from
+SUBJECT_POOL_SIZE = 50
+
+def _split_sentences(text: str) -> List[str]:
+    """Split text into sentences long enough to build a question from."""
+    sentences = _SENTENCE_BOUNDARY.split(text.replace('\n', ' '))
+    return [s.strip() for s in sentences if len(s.strip()) > 30]
+
+class DocumentIndex:
+    """
+    Tokenized view of a document, built once before questions are generated.
+    
+    Sentences are stored in document order together with their words; each
+    chunk is a span of sentence indexes with its own term frequencies. Term
+    statistics for the whole document (total counts and the number of chunks
+    each term occurs in) are accumulated from the chunk counts in the same
+    pass, without stopwords, and keyword rankings are cached. Question
+    generators sample from these arrays instead of re-splitting the text.
+    The TF-IDF matrix of the sentences is built on first use.
+    """
+    
+    def __init__(self, text: str, max_chunks: int = MAX_CHUNKS):
+        """
+        Args:
+            text: Text extracted from PDF
+            max_chunks: Number of chunks the document is split into at most
+        """
+        self.text = text
+        self.sentences: List[str] = []
+        self.sentence_words: List[List[str]] = []
+        self.chunks: List[Tuple[int, int]] = []
+        self.chunk_terms: List[Counter] = []
+        self.document_terms: Counter = Counter()
+        self.chunk_frequency: Counter = Counter()
+        self._keywords: Dict[Tuple[int, int], List[str]] = {}
+        self._document_keywords: Dict[int, List[str]] = {}
+        self._similarity = None
+        
+        # Split into paragraphs first (for chunking)
+        paragraphs = re.split(r'\n\s*\n', text)
+        paragraphs = [p.strip() for p in paragraphs if len(p.strip()) > 50]
+        
+        if len(paragraphs) >= 10:
+            units = paragraphs
+        else:
+            # If too few paragraphs, create paragraph-like groups of sentences
+            logger.info("Too few paragraphs, splitting by sentences")
+            sentences = _split_sentences(text)
+            group_size = max(5, len(sentences) // 20)  # Aim for at least 20 groups
+            units = [sentences[i:i + group_size] for i in range(0, len(sentences), group_size)]
+        
+        # Create even-sized chunks by grouping paragraphs
+        units_per_chunk = max(1, len(units) // max(1, min(max_chunks, len(units))))
+        for i in range(0, len(units), units_per_chunk):
+            group = units[i:i + units_per_chunk]
+            if units is paragraphs:
+                chunk_text = ' '.join(group)
+                chunk_sentences = _split_sentences(chunk_text)
+            else:
+                chunk_sentences = [sentence for unit in group for sentence in unit]
+                chunk_text = ' '.join(chunk_sentences)
+            
+            self.chunks.append((len(self.sentences), len(self.sentences) + len(chunk_sentences)))
+            self.sentences.extend(chunk_sentences)
+            self.sentence_words.extend(sentence.split() for sentence in chunk_sentences)
+            
+            terms = Counter(word for word in _KEYWORD.findall(chunk_text.lower()) if word not in STOPWORDS)
+            self.chunk_terms.append(terms)
+            self.document_terms.update(terms)
+            self.chunk_frequency.update(terms.keys())
+    
+    def idf(self, term: str) -> float:
+        """Smoothed inverse chunk frequency: terms found in every chunk weigh least."""
+        return math.log((1 + len(self.chunks)) / (1 + self.chunk_frequency[term])) + 1
+    
+    def keywords(self, chunk_index: int, n: int = 5) -> List[str]:
+        """
+        Top n words of a chunk by frequency in the chunk times IDF across chunks,
+        so words that characterize the chunk beat words common to the whole
+        document. Computed once per chunk with a heap instead of a full sort.
+        """
+        key = (chunk_index, n)
+        if key not in self._keywords:
+            terms = self.chunk_terms[chunk_index]
+            top = heapq.nlargest(n, terms.items(), key=lambda item: item[1] * self.idf(item[0]))
+            self._keywords[key] = [word for word, _ in top]
+        return self._keywords[key]
+    
+    def document_keywords(self, n: int = SUBJECT_POOL_SIZE) -> List[str]:
+        """Top n most frequent meaningful words of the whole document, computed once."""
+        if n not in self._document_keywords:
+            top = heapq.nlargest(n, self.document_terms.items(), key=lambda item: item[1])
+            self._document_keywords[n] = [word for word, _ in top]
+        return self._document_keywords[n]
+    
+    @property
+    def similarity(self) -> SentenceMatrix:
+        """TF-IDF vectors of all sentences, built once."""
+        if self._similarity is None:
+            self._similarity = SentenceMatrix(self.sentences)
+        return self._similarity
+    
+    def random_subject(self) -> str:
+        """Pick one of the document's top keywords as a subject."""
+        subjects = self.document_keywords()
+        if subjects:
+            return random.choice(subjects)
+        return "the topic"
+
+def generate_questions(text: str, num_questions: int = None, max_workers: int = None,
+                       fill: bool = True) -> List[Dict[str, Any]]:
     """
     Generate multiple-choice questions from PDF text.
     
+    Every chunk is drafted with its own random generator, seeded from the
+    module's random state, so the same seed gives the same questions whether
+    the chunks are drafted in-process or by any number of worker processes.
+    
     Args:
         text: Text extracted from PDF
         num_questions: Number of questions to generate
+        max_workers: Worker processes for drafting, 1 drafts in-process (defaults to QUESTION_WORKERS);
+            the pool is shared with page extraction, whichever starts it first sets its size
+        fill: Reach num_questions by asking about sentences again and adding generic
+            questions; if False, each sentence is asked about at most once and fewer
+            questions may be returned
         
     Returns:
         List of question dictionaries with options and correct answer
@@ -44,40 +196,15 @@ def generate_questions(text: str, num_questions: int = None) -> List[Dict[str, A
         # using some simple NLP techniques and chunking for better coverage
         logger.info(f"Generating {num_questions} multiple-choice questions using chunking method")
         
-        # Simplify text to make processing easier
-        simplified_text = text.replace('\n', ' ').strip()
-        
-        # Split into paragraphs first (for chunking)
-        paragraphs = re.split(r'\n\s*\n', text)
-        paragraphs = [p.strip() for p in paragraphs if len(p.strip()) > 50]
-        
-        # If too few paragraphs, split by sentences
-        if len(paragraphs) < 10:
-            logger.info("Too few paragraphs, splitting by sentences")
-            sentences = re.split(r'[.!?]+', simplified_text)
-            sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
-            
-            # Create paragraph-like chunks from sentences
-            chunk_size = max(5, len(sentences) // 20)  # Aim for at least 20 chunks
-            paragraphs = []
-            for i in range(0, len(sentences), chunk_size):
-                paragraph = ' '.join(sentences[i:i+chunk_size])
-                if paragraph:
-                    paragraphs.append(paragraph)
+        # Tokenize the document once; every generator below samples from this index
+        index = DocumentIndex(text)
         
         # Calculate chunks needed
-        num_chunks = min(20, len(paragraphs))  # Max 20 chunks
+        num_chunks = len(index.chunks)
         questions_per_chunk = math.ceil(num_questions / num_chunks)
         
         logger.info(f"Created {num_chunks} chunks with ~{questions_per_chunk} questions per chunk")
         
-        # Create even-sized chunks by grouping paragraphs
-        chunks = []
-        paragraphs_per_chunk = max(1, len(paragraphs) // num_chunks)
-        for i in range(0, len(paragraphs), paragraphs_per_chunk):
-            chunk = ' '.join(paragraphs[i:i+paragraphs_per_chunk])
-            chunks.append(chunk)
-        
         # Additional templates for more question variety
         general_templates = [
             "What is described as {phrase}?",
@@ -131,43 +258,54 @@ def generate_questions(text: str, num_questions: int = None) -> List[Dict[str, A
         # Combine all templates for variety
         all_templates = general_templates + factual_templates + analytical_templates + comparison_templates
         
-        # Generate questions from each chunk
-        all_questions = []
-        cumulative_questions = 0
+        # Draft up to questions_per_chunk questions from every chunk, with one seed per chunk
+        base_seed = random.getrandbits(64)
+        chunk_seeds = [f"{base_seed}:{chunk_index}" for chunk_index in range(num_chunks)]
+        max_workers = max_workers or QUESTION_WORKERS
+        chunk_drafts = None
+        if max_workers > 1 and num_chunks > 1 and len(text) >= QUESTION_PARALLEL_MIN_CHARS:
+            chunk_drafts = _draft_chunks_in_pool(index, questions_per_chunk, all_templates, chunk_seeds, max_workers)
+        if chunk_drafts is None:
+            # Small documents (where starting workers would dominate) or a failed pool
+            chunk_drafts = [
+                draft_questions_from_chunk(index, chunk_index, questions_per_chunk, all_templates, random.Random(seed))
+                for chunk_index, seed in enumerate(chunk_seeds)
+            ]
         
-        for chunk_index, chunk_text in enumerate(chunks):
-            # Calculate how many questions to generate from this chunk
+        # Merge the chunks in order
+        drafts = []
+        for chunk_index in range(num_chunks):
+            # Calculate how many questions to take from this chunk
             # Adjust to ensure we get exactly num_questions total
-            remaining_chunks = len(chunks) - chunk_index
-            remaining_questions = num_questions - cumulative_questions
+            remaining_chunks = num_chunks - chunk_index
+            remaining_questions = num_questions - len(drafts)
             target_questions = min(questions_per_chunk, math.ceil(remaining_questions / remaining_chunks))
             
-            logger.info(f"Processing chunk {chunk_index+1}/{len(chunks)}, aiming for {target_questions} questions")
-            
-            # Generate questions for this chunk
-            chunk_questions = generate_questions_from_chunk(chunk_text, target_questions, all_templates)
-            all_questions.extend(chunk_questions)
-            cumulative_questions += len(chunk_questions)
+            # Drafts are a random sample of the chunk, so any prefix is one too
+            chunk = chunk_drafts[chunk_index]
+            if not fill:
+                # Sentences only repeat once every sentence of the chunk was asked about
+                chunk = chunk[:len({sentence_id for sentence_id, _, _ in chunk})]
+            drafts.extend(chunk[:target_questions])
             
             # Break if we've reached our target
-            if cumulative_questions >= num_questions:
+            if len(drafts) >= num_questions:
                 break
         
-        # Ensure we have exactly the requested number of questions
-        if len(all_questions) > num_questions:
-            all_questions = all_questions[:num_questions]
+        # Add answer options to all drafted questions at once, up to the requested number
+        all_questions = add_answer_options(index, drafts[:num_questions])
         
         # If we couldn't generate enough questions, add generic ones
-        while len(all_questions) < num_questions:
+        while fill and len(all_questions) < num_questions:
             i = len(all_questions)
             generic_question = f"Question {i+1}: What is the main topic discussed in this section of the document?"
             
             # Generic options with slightly more variety
             options = {
                 "A": "The section relates to key information presented in the text.",
-                "B": f"The section focuses on {get_random_subject(text)}.",
-                "C": f"The section analyzes various aspects of {get_random_subject(text)}.",
-                "D": f"The section explains the relationship between {get_random_subject(text)} and {get_random_subject(text)}."
+                "B": f"The section focuses on {index.random_subject()}.",
+                "C": f"The section analyzes various aspects of {index.random_subject()}.",
+                "D": f"The section explains the relationship between {index.random_subject()} and {index.random_subject()}."
             }
             
             all_questions.append({
@@ -181,6 +319,8 @@ def generate_questions(text: str, num_questions: int = None) -> List[Dict[str, A
     
     except Exception as e:
         logger.error(f"Error generating questions: {str(e)}")
+        if not fill:
+            return []
         # Return a default set of questions if generation fails
         return [
             {
@@ -195,113 +335,198 @@ def generate_questions(text: str, num_questions: int = None) -> List[Dict[str, A
             } for i in range(num_questions)
         ]
 
-def get_random_subject(text):
-    """Extract a random meaningful subject from text"""
-    words = text.split()
-    meaningful_words = [word for word in words if len(word) > 5 and word.isalpha()]
-    
-    if meaningful_words:
-        return random.choice(meaningful_words)
-    return "the topic"
-
-def extract_keywords(text, n=5):
-    """Extract top n most frequent meaningful words as keywords"""
-    # Simple keyword extraction based on word frequency
-    words = re.findall(r'\b[a-zA-Z]{5,}\b', text.lower())  # Words with 5+ letters
-    word_counts = {}
-    for word in words:
-        if word not in word_counts:
-            word_counts[word] = 0
-        word_counts[word] += 1
-    
-    # Sort by frequency and get top n
-    sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-    return [word for word, _ in sorted_words[:n]]
-
-def generate_questions_from_chunk(chunk_text, num_chunk_questions, templates):
-    """Generate questions from a specific chunk of text"""
-    # Simplify chunk text
-    simplified_chunk = chunk_text.replace('\n', ' ').strip()
+def generate_questions_from_sections(sections: Iterable[Tuple[str, int]], total_pages: int,
+                                     num_questions: int = None) -> List[Dict[str, Any]]:
+    """
+    Generate multiple-choice questions while the document is still being extracted.
+    Each section gets a share of the questions proportional to its page count,
+    but asks about each of its sentences at most once; the share a section
+    cannot use (too little text, or none) carries over to the following ones,
+    and the whole text is only padded once at the end.
     
-    # Split into sentences
-    sentences = re.split(r'[.!?]+', simplified_chunk)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
+    Args:
+        sections: Iterable of (section_text, section_page_count) in page order
+        total_pages: Number of pages in the whole document
+        num_questions: Number of questions to generate
+        
+    Returns:
+        List of question dictionaries with options and correct answer
+    """
+    if num_questions is None:
+        num_questions = DEFAULT_QUESTIONS_PER_TEST
     
-    # If we have too few sentences, duplicate them
-    while len(sentences) < num_chunk_questions * 3:
-        sentences.extend(sentences)
+    questions = []
+    section_texts = []
+    pages_done = 0
+    for section_text, section_pages in sections:
+        pages_done += section_pages
+        section_texts.append(section_text)
+        if not section_text.strip():
+            continue
+        
+        # Aim for the document-wide share reached at the end of this section
+        target = math.ceil(num_questions * min(1.0, pages_done / max(1, total_pages)))
+        if target > len(questions):
+            logger.info(f"Generating {target - len(questions)} questions from pages up to {pages_done}/{total_pages}")
+            questions.extend(generate_questions(section_text, target - len(questions), fill=False))
     
-    # Extract keywords from this chunk for better context
-    keywords = extract_keywords(simplified_chunk)
+    # Fill up from the whole text if the sections fell short
+    if len(questions) < num_questions:
+        questions.extend(generate_questions(' '.join(section_texts), num_questions - len(questions)))
     
-    # Shuffle sentences to get more variety
-    random.shuffle(sentences)
+    return questions[:num_questions]
+
+def _option_text(sentence: str) -> str:
+    """Shorten a sentence to the length shown as an answer option."""
+    if len(sentence) > 100:
+        return sentence[:100].strip() + "..."
+    return sentence
+
+def _sample_question_sentences(candidates: List[int], count: int, rng: random.Random) -> List[int]:
+    """
+    Pick the sentences to ask about, without replacement until every candidate
+    has been used once (then the next round starts). Time and memory are O(count).
+    """
+    picked = []
+    while candidates and len(picked) < count:
+        picked.extend(rng.sample(candidates, min(count - len(picked), len(candidates))))
+    return picked
+
+def _draft_chunks_in_pool(index: DocumentIndex, num_chunk_questions: int, templates,
+                          chunk_seeds: List[str], max_workers: int):
+    """
+    Draft every chunk in the process pool. Each task only receives its chunk's words.
     
-    # Generate questions from the sentences
-    chunk_questions = []
+    Returns:
+        Drafts of each chunk in chunk order, or None if the pool failed
+    """
+    try:
+        pool = get_process_pool('cpu', max_workers)
+        futures = []
+        for chunk_index, seed in enumerate(chunk_seeds):
+            start, end = index.chunks[chunk_index]
+            futures.append(pool.submit(
+                _draft_chunk_task, index.sentence_words[start:end], start, chunk_index,
+                index.keywords(chunk_index), num_chunk_questions, templates, seed
+            ))
+        logger.info(f"Drafting {len(futures)} chunks in parallel")
+        return [future.result() for future in futures]
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            discard_process_pool('cpu')
+        logger.warning(f"Parallel question drafting failed, drafting in-process: {str(e)}")
+        return None
+
+def _draft_chunk_task(sentence_words: List[List[str]], first_sentence_id: int, chunk_index: int,
+                      keywords: List[str], num_chunk_questions: int, templates, seed: str) -> List[Tuple[int, int, str]]:
+    """Draft one chunk inside a worker process, with the chunk's own random generator."""
+    return _draft_sentences(sentence_words, first_sentence_id, chunk_index, keywords,
+                            num_chunk_questions, templates, random.Random(seed))
+
+def draft_questions_from_chunk(index: DocumentIndex, chunk_index: int, num_chunk_questions: int,
+                               templates, rng: random.Random = None) -> List[Tuple[int, int, str]]:
+    """
+    Pick sentences of one chunk of an indexed document and phrase a question about each.
     
-    # Generate questions up to the requested number
-    for i in range(min(num_chunk_questions, len(sentences))):
-        sentence = sentences[i]
-        words = sentence.split()
+    Args:
+        index: Document index
+        chunk_index: Chunk to draft questions from
+        num_chunk_questions: Number of questions to draft
+        templates: Question templates
+        rng: Random generator (defaults to the random module)
+        
+    Returns:
+        List of (sentence id, chunk index, question text); see add_answer_options
+    """
+    start, end = index.chunks[chunk_index]
+    return _draft_sentences(index.sentence_words[start:end], start, chunk_index,
+                            index.keywords(chunk_index), num_chunk_questions, templates, rng or random)
+
+def _draft_sentences(sentence_words: List[List[str]], first_sentence_id: int, chunk_index: int,
+                     keywords: List[str], num_chunk_questions: int, templates, rng) -> List[Tuple[int, int, str]]:
+    """Draft questions from the words of one chunk's sentences, numbered from first_sentence_id."""
+    # Only sentences with enough words to build a question from can be asked about
+    candidates = [i for i, words in enumerate(sentence_words) if len(words) >= 5]
+    
+    # Draft questions from the sentences
+    chunk_drafts = []
+    
+    # Draft questions up to the requested number, reusing sentences only once all were asked
+    for i in _sample_question_sentences(candidates, num_chunk_questions, rng):
+        words = sentence_words[i]
         
-        if len(words) < 5:
-            continue
-            
         # Extract some key phrases
         subject = " ".join(words[:2])
         sentence_start = " ".join(words[:5])
-        phrase = " ".join(random.sample(words, min(3, len(words))))
+        phrase = " ".join(rng.sample(words, min(3, len(words))))
         
         # Better subject extraction - try to use keywords
-        if keywords and random.random() < 0.7:  # 70% chance to use a keyword
-            subject = random.choice(keywords)
+        if keywords and rng.random() < 0.7:  # 70% chance to use a keyword
+            subject = rng.choice(keywords)
         
         # Find a related term
-        related = random.choice(words)
-        if len(keywords) > 1 and random.random() < 0.7:  # 70% chance to use another keyword
+        related = rng.choice(words)
+        if len(keywords) > 1 and rng.random() < 0.7:  # 70% chance to use another keyword
             keywords_copy = keywords.copy()
             if subject in keywords_copy:
                 keywords_copy.remove(subject)
-            related = random.choice(keywords_copy)
+            related = rng.choice(keywords_copy)
         
         # Pick a random template
-        template_q = random.choice(templates)
+        template_q = rng.choice(templates)
         
         # Generate question from template
         question = template_q.format(
             phrase=phrase,
             subject=subject,
-            category=random.choice(["concept", "term", "idea", "principle", "factor", "method", "approach", "theory"]),
+            category=rng.choice(["concept", "term", "idea", "principle", "factor", "method", "approach", "theory"]),
             sentence_start=sentence_start,
             related=related,
             concept=subject,
-            element=random.choice(words)
+            element=rng.choice(words)
         )
         
+        chunk_drafts.append((first_sentence_id + i, chunk_index, question))
+    
+    return chunk_drafts
+
+def add_answer_options(index: DocumentIndex, drafts: List[Tuple[int, int, str]]) -> List[Dict[str, Any]]:
+    """
+    Complete drafted questions with four shuffled options. The distractors are the
+    sentences of the same chunk most similar to the correct answer (TF-IDF cosine
+    similarity), ranked for all questions in one batch; near-duplicates of the
+    answer are skipped.
+    
+    Args:
+        index: Document index the drafts were made from
+        drafts: (sentence id, chunk index, question text) tuples
+        
+    Returns:
+        List of question dictionaries with options and correct answer
+    """
+    rankings = index.similarity.rank(
+        [sentence_id for sentence_id, _, _ in drafts],
+        [index.chunks[chunk_index] for _, chunk_index, _ in drafts]
+    )
+    
+    questions = []
+    for (sentence_id, _, question), (ranked_ids, similarities) in zip(drafts, rankings):
         # Generate the correct answer
-        if len(sentence) > 100:
-            correct_answer = sentence[:100].strip() + "..."
-        else:
-            correct_answer = sentence
+        correct_answer = _option_text(index.sentences[sentence_id])
         
-        # Generate distractor options
+        # Take the most similar distinct sentences as distractors (3 distractors)
         distractors = []
+        seen = {correct_answer}
+        for candidate, similarity in zip(ranked_ids.tolist(), similarities.tolist()):
+            if len(distractors) == 3:
+                break
+            option = _option_text(index.sentences[candidate])
+            if similarity < DISTRACTOR_MAX_SIMILARITY and option not in seen:
+                seen.add(option)
+                distractors.append(option)
         
-        # Use other sentences as distractors
-        other_sentences = [s for s in sentences if s != sentence]
-        
-        for _ in range(3):  # 3 distractors
-            if other_sentences:
-                distractor = random.choice(other_sentences)
-                other_sentences.remove(distractor)
-                if len(distractor) > 100:
-                    distractor = distractor[:100].strip() + "..."
-                distractors.append(distractor)
-            else:
-                # Fallback if we don't have enough sentences
-                distractor = "Information not provided in this section of the text."
-                distractors.append(distractor)
+        # Fallback if we don't have enough distinct sentences
+        distractors.extend([NO_DISTRACTOR] * (3 - len(distractors)))
         
         # Create all options and randomize their order
         options = [correct_answer] + distractors
@@ -315,17 +540,13 @@ def generate_questions_from_chunk(chunk_text, num_chunk_questions, templates):
         for j, option in enumerate(options):
             labeled_options[chr(65 + j)] = option  # A, B, C, D
         
-        chunk_questions.append({
+        questions.append({
             "question": question,
             "options": labeled_options,
             "answer": chr(65 + correct_index)  # A, B, C, D
         })
-        
-        # Return the requested number of questions
-        if len(chunk_questions) == num_chunk_questions:
-            break
     
-    return chunk_questions
+    return questions
 
 def generate_ojee_questions(subject: str = None, num_questions: int = 30, math_count: int = None, computer_count: int = None):
     """
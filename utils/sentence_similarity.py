@@ -0,0 +1,119 @@
+import re
+import logging
+from typing import List, Tuple
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_TERM = re.compile(r'[a-z0-9]+')
+
+class SentenceMatrix:
+    """
+    TF-IDF vectors of a document's sentences, built once with NumPy.
+
+    The matrix is stored in compressed sparse row form: the terms of sentence i
+    are `terms[indptr[i]:indptr[i + 1]]` (sorted by term id) with their
+    L2-normalized weights in `weights`, so the dot product of two rows is
+    their cosine similarity.
+    """
+
+    def __init__(self, sentences: List[str]):
+        """
+        Args:
+            sentences: Sentences in document order; row i of the matrix is sentences[i]
+        """
+        vocabulary = {}
+        term_ids = []
+        lengths = []
+        for sentence in sentences:
+            tokens = _TERM.findall(sentence.lower())
+            term_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            lengths.append(len(tokens))
+
+        self.num_sentences = len(sentences)
+        self.num_terms = max(1, len(vocabulary))
+
+        # Count each (sentence, term) pair; unique keys come out sorted by sentence, then term
+        rows = np.repeat(np.arange(self.num_sentences, dtype=np.int64), lengths)
+        keys, counts = np.unique(rows * self.num_terms + np.asarray(term_ids, dtype=np.int64), return_counts=True)
+        entry_rows = keys // self.num_terms
+        self.terms = keys % self.num_terms
+
+        # Sublinear term frequency times smoothed inverse document frequency
+        document_frequency = np.bincount(self.terms, minlength=self.num_terms)
+        idf = np.log((1 + self.num_sentences) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(counts)) * idf[self.terms]
+
+        norms = np.sqrt(np.bincount(entry_rows, weights=weights ** 2, minlength=self.num_sentences))
+        self.weights = (weights / norms[entry_rows]).astype(np.float32)
+        self.entry_rows = entry_rows
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(entry_rows, minlength=self.num_sentences))))
+
+    def rank(self, queries: List[int], pools: List[Tuple[int, int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Rank candidate sentences by cosine similarity to query sentences, for all
+        queries in one batch.
+
+        Args:
+            queries: Row of each query sentence
+            pools: (start, end) span of candidate rows for each query
+
+        Returns:
+            For each query, (candidate rows, similarities) ordered from most to least
+            similar; the query sentence itself is left out
+        """
+        if not queries:
+            return []
+        queries = np.asarray(queries, dtype=np.int64)
+        starts = np.asarray([start for start, _ in pools], dtype=np.int64)
+        ends = np.asarray([end for _, end in pools], dtype=np.int64)
+        owners = np.arange(len(queries), dtype=np.int64)
+
+        # Terms of every query, keyed by (query, term) so candidates can look up the query weight
+        query_lengths = self.indptr[queries + 1] - self.indptr[queries]
+        query_entries = self._gather(self.indptr[queries], query_lengths)
+        query_keys = np.repeat(owners, query_lengths) * self.num_terms + self.terms[query_entries]
+        query_weights = self.weights[query_entries]
+
+        # Every stored entry of every query's candidate rows
+        entry_lengths = self.indptr[ends] - self.indptr[starts]
+        entries = self._gather(self.indptr[starts], entry_lengths)
+        entry_owners = np.repeat(owners, entry_lengths)
+        candidate_keys = entry_owners * self.num_terms + self.terms[entries]
+
+        # Dot products: sum the products of weights for terms a candidate shares with its query
+        if len(query_keys):
+            positions = np.minimum(np.searchsorted(query_keys, candidate_keys), len(query_keys) - 1)
+            shared = query_keys[positions] == candidate_keys
+            products = np.where(shared, self.weights[entries] * query_weights[positions], 0)
+        else:
+            # No query has a term (e.g. non-Latin text), so every candidate scores zero
+            products = np.zeros(len(entries))
+
+        # One score slot per (query, candidate row) pair
+        pool_sizes = ends - starts
+        slot_offsets = np.concatenate(([0], np.cumsum(pool_sizes)))
+        slots = slot_offsets[entry_owners] + self.entry_rows[entries] - starts[entry_owners]
+        scores = np.bincount(slots, weights=products, minlength=int(slot_offsets[-1]))
+        candidates = self._gather(starts, pool_sizes)
+        slot_owners = np.repeat(owners, pool_sizes)
+
+        # Leave out the query itself, then sort every query's slots by descending similarity
+        keep = candidates != queries[slot_owners]
+        candidates, scores, slot_owners = candidates[keep], scores[keep], slot_owners[keep]
+        order = np.lexsort((-scores, slot_owners))
+        bounds = np.searchsorted(slot_owners[order], np.arange(len(queries) + 1))
+        return [
+            (candidates[order[bounds[i]:bounds[i + 1]]], scores[order[bounds[i]:bounds[i + 1]]])
+            for i in range(len(queries))
+        ]
+
+    @staticmethod
+    def _gather(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Concatenate the index ranges [start, start + length) without a Python loop."""
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        return np.repeat(starts - offsets, lengths) + np.arange(total, dtype=np.int64)